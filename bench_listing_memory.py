@@ -0,0 +1,84 @@
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from listing_record import Listing, ListingTable
+
+NEIGHBORHOODS = ['Kitsilano', 'Mount Pleasant', 'West End', 'Yaletown', 'Fairview', 'Kerrisdale', 'Burnaby', 'Richmond']
+HOUSING_TYPES = ['apartment', 'house', 'condo', 'townhouse', 'basement']
+
+
+def make_entries(count: int, seed: int = 0) -> dict:
+    """
+    Synthetic {link: entry} database shaped like listings_database.json
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    database = {}
+    for i in range(count):
+        database[f'https://vancouver.craigslist.org/van/sub/d/listing/{7000000000 + i}.html'] = {
+            'date_scraped': (today - timedelta(days=rng.randrange(30))).isoformat(),
+            'price': rng.randrange(900, 4000),
+            'rooms': rng.randrange(0, 4),
+            'separate_bath': rng.random() < 0.5,
+            'separate_kitchen': rng.random() < 0.5,
+            'neighborhood': rng.choice(NEIGHBORHOODS),
+            'latitude': 49.2 + rng.random() * 0.1,
+            'longitude': -123.2 + rng.random() * 0.15,
+            'start_date': (today + timedelta(days=rng.randrange(90))).isoformat(),
+            'num_images': rng.randrange(0, 20),
+            'has_watermark': False,
+            'description': f'Bright room number {i}, close to transit. ' * 4,
+            'housing_type': rng.choice(HOUSING_TYPES),
+            'rent_period': 'monthly',
+            'amenities': ['laundry'] if rng.random() < 0.5 else [],
+            'furnished': rng.random() < 0.5,
+            'parking': None,
+            'gym': None,
+            'dishwasher': rng.random() < 0.3,
+            'utilities': None,
+        }
+    return database
+
+
+def measure(label: str, build):
+    """
+    Memory retained by the result of build() and the time it took
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {current / 1024 / 1024:>9.1f} MB {elapsed:>8.2f} s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of dict vs Listing vs ListingTable representations")
+    parser.add_argument('--count', type=int, default=100000, help="Number of synthetic listings")
+    args = parser.parse_args()
+
+    # every representation is built from the JSON text, like load_json_database() does
+    source = json.dumps(make_entries(args.count))
+    print(f"{args.count} listings (descriptions included in every representation)")
+    print(f"{'representation':<28} {'memory':>12} {'build':>10}")
+
+    dicts = measure('dict of dicts', lambda: json.loads(source))
+    del dicts
+    records = measure(
+        'dict of Listing (__slots__)',
+        lambda: {link: Listing.from_dict(entry, link=link) for link, entry in json.loads(source).items()}
+    )
+    del records
+    table = measure('ListingTable (columnar)', lambda: ListingTable.from_database(json.loads(source)))
+
+    start = time.perf_counter()
+    prices = table.values('price')
+    print(f"\nAverage price over the price column: ${sum(prices) / len(prices):.2f} ({(time.perf_counter() - start) * 1000:.1f} ms)")
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from listing_record import LISTING_FIELDS, _to_int
+
+HISTORY_PATH = 'listings_history.db'
+
+# Fields whose changes are recorded; the scrape date changes every time and
+# the description is too large to keep versions of
+TRACKED_FIELDS = tuple(field for field in LISTING_FIELDS if field not in ('date_scraped', 'description'))
+
+# Numbers the LLM sometimes returns as strings ('1900', '$1,900'); compared
+# and stored as integers so they are not seen as changes and price_drops can
+# do arithmetic on them
+NUMERIC_FIELDS = ('price', 'rooms')
+
+
+def _normalize(field: str, value):
+    if field in NUMERIC_FIELDS and value is not None:
+        number = _to_int(value)
+        return number if number is not None else value
+    return value
+
+
+def diff_entries(old_entry: Dict[str, any], new_entry: Dict[str, any]) -> Dict[str, Tuple[any, any]]:
+    """
+    {field: (old, new)} for the tracked fields that differ between two
+    database entries, with price and rooms compared as integers
+    """
+    changes = {}
+    for field in TRACKED_FIELDS:
+        old, new = _normalize(field, old_entry.get(field)), _normalize(field, new_entry.get(field))
+        if old != new:
+            changes[field] = (old, new)
+    return changes
+
+
+class ChangeHistory:
+    """
+    Per-field change log of re-scraped listings, stored in SQLite.
+
+    Only fields that actually changed are written (one row per field per
+    scrape), so the log grows with the number of changes, not scrapes.
+    """
+
+    def __init__(self, db_path: str = HISTORY_PATH):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS field_changes (
+                    link TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    old_value TEXT,
+                    new_value TEXT,
+                    changed_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_field_changes_link ON field_changes (link, changed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_field_changes_field ON field_changes (field, changed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def record(self, changes: Dict[str, Dict[str, Tuple[any, any]]], changed_at: Optional[str] = None) -> int:
+        """
+        Store {link: {field: (old, new)}} in one transaction.
+        Returns the number of field changes written.
+        """
+        changed_at = changed_at or datetime.now().isoformat(timespec='seconds')
+        rows = [
+            (
+                link, field,
+                json.dumps(_normalize(field, old), default=str), json.dumps(_normalize(field, new), default=str),
+                changed_at
+            )
+            for link, fields in changes.items()
+            for field, (old, new) in fields.items()
+        ]
+        if rows:
+            with closing(self._connect()) as conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO field_changes (link, field, old_value, new_value, changed_at) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+        return len(rows)
+
+    def history(self, link: str) -> List[Dict[str, any]]:
+        """
+        All recorded changes of one listing, oldest first
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT field, old_value, new_value, changed_at FROM field_changes WHERE link = ? ORDER BY changed_at",
+                (link,)
+            ).fetchall()
+        return [
+            {'field': field, 'old': json.loads(old), 'new': json.loads(new), 'changed_at': changed_at}
+            for field, old, new, changed_at in rows
+        ]
+
+    def changes_since(self, field: str, since: datetime) -> List[Dict[str, any]]:
+        """
+        Changes of one field since a point in time, newest first
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT link, old_value, new_value, changed_at FROM field_changes "
+                "WHERE field = ? AND changed_at >= ? ORDER BY changed_at DESC",
+                (field, since.isoformat(timespec='seconds'))
+            ).fetchall()
+        return [
+            {'link': link, 'old': json.loads(old), 'new': json.loads(new), 'changed_at': changed_at}
+            for link, old, new, changed_at in rows
+        ]
+
+    def price_drops(self, min_drop_pct: float = 10, days: float = 7) -> List[Dict[str, any]]:
+        """
+        Listings whose price dropped by at least `min_drop_pct` percent in the
+        last `days` days, biggest drop first. Compares the price before the
+        first change in the window with the latest price, so several small
+        cuts add up (1000 -> 940 -> 880 is a 12% drop).
+        """
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                WITH price_changes AS (
+                    SELECT link, CAST(old_value AS REAL) AS old_price, CAST(new_value AS REAL) AS new_price, changed_at,
+                           ROW_NUMBER() OVER (PARTITION BY link ORDER BY changed_at, rowid) AS first_rank,
+                           ROW_NUMBER() OVER (PARTITION BY link ORDER BY changed_at DESC, rowid DESC) AS last_rank
+                    FROM field_changes
+                    WHERE field = 'price' AND changed_at >= ?
+                )
+                SELECT first.link, first.old_price, last.new_price, last.changed_at,
+                       100.0 * (first.old_price - last.new_price) / first.old_price AS drop_pct
+                FROM price_changes AS first
+                JOIN price_changes AS last ON last.link = first.link AND last.last_rank = 1
+                WHERE first.first_rank = 1
+                  AND first.old_price > 0 AND last.new_price > 0
+                  AND 100.0 * (first.old_price - last.new_price) / first.old_price >= ?
+                ORDER BY drop_pct DESC
+                """,
+                (since, min_drop_pct)
+            ).fetchall()
+        return [
+            {'link': link, 'old': old, 'new': new, 'changed_at': changed_at, 'drop_pct': round(drop_pct, 1)}
+            for link, old, new, changed_at, drop_pct in rows
+        ]
+
+
+if __name__ == "__main__":
+    for drop in ChangeHistory().price_drops(min_drop_pct=10, days=7):
+        print(f"-{drop['drop_pct']}%  ${drop['old']:.0f} -> ${drop['new']:.0f}  {drop['link']}")
@@ -1,7 +1,13 @@
+import argparse
+import os
 import requests
-from bs4 import BeautifulSoup
-from typing import Optional
-from csv_extraction import update_listings_csv
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional
+from http_client import get_http_client
+from csv_extraction import group_writer, save_listings, update_listings_csv
+from listing_store import GroupCommitWriter
+from listing_pipeline import run_pipeline
+from profiling import profile_run
 
 
 def build_craigslist_url(
@@ -11,7 +17,8 @@ def build_craigslist_url(
     min_price: Optional[int] = None,
     postal_code: Optional[str] = None,
     search_distance: Optional[int] = None,
-    query: Optional[str] = None
+    query: Optional[str] = None,
+    base_url: Optional[str] = None
 ) -> str:
     """
     Build a Craigslist URL based on search parameters.
@@ -24,9 +31,12 @@ def build_craigslist_url(
         postal_code: Postal/ZIP code to search around
         search_distance: Search radius in miles from postal code
         query: Search terms
+        base_url: Site root to search instead of https://<city>.craigslist.org
+            (defaults to the CRAIGSLIST_BASE_URL environment variable, e.g. a mock server)
     """
     # Base URL construction
-    base_url = f'https://{city}.craigslist.org/search/{category}'
+    site = base_url or os.getenv('CRAIGSLIST_BASE_URL') or f'https://{city}.craigslist.org'
+    base_url = f"{site.rstrip('/')}/search/{category}"
     
     # Build query parameters
     params = {}
@@ -47,7 +57,27 @@ def build_craigslist_url(
         return f"{base_url}?{'&'.join(param_strings)}"
     return base_url
 
-def scrape_craigslist(
+class _LinkParser(HTMLParser):
+    """
+    Incremental HTML parser that collects fully qualified <a href> links
+    from each chunk it is fed
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        href = (dict(attrs).get('href') or '').strip()
+        if href and not href.startswith('#'):
+            # Optional: Only include fully qualified URLs
+            if href.startswith('http://') or href.startswith('https://'):
+                self.links.append(href)
+
+
+def iter_craigslist_links(
     city: str = 'vancouver',
     category: str = 'sub',
     max_price: Optional[int] = None,
@@ -55,7 +85,12 @@ def scrape_craigslist(
     postal_code: Optional[str] = None,
     search_distance: Optional[int] = None,
     query: Optional[str] = None
-):
+) -> Iterator[str]:
+    """
+    Yield listing links from a Craigslist search as soon as they are parsed,
+    while the rest of the results page is still downloading.
+    Takes the same arguments as build_craigslist_url().
+    """
     url = build_craigslist_url(
         city=city,
         category=category,
@@ -71,32 +106,64 @@ def scrape_craigslist(
     }
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # listings = soup.select("a") # links to the listing
-        valid_links = []
-        for a in soup.find_all('a', href=True):
-            href = a['href'].strip()
-            if href and not href.startswith('#'):
-                # Optional: Only include fully qualified URLs
-                if href.startswith('http://') or href.startswith('https://'):
-                    valid_links.append(href)
-        return valid_links
-        # agent to find whether the criterion is actually met. 
-        # method wtihte hin in 
-
-        print("🔍 Sublet Listings in Vancouver (May, under $1200):\n")
-        for link in listings:
-            print(f"🔗 {link['href']}\n")
+        with get_http_client().get(url, headers=headers, stream=True) as response:
+            if response.encoding is None:
+                response.encoding = 'utf-8'
+
+            parser = _LinkParser()
+            for chunk in response.iter_content(chunk_size=16 * 1024, decode_unicode=True):
+                parser.feed(chunk)
+                yield from parser.links
+                parser.links.clear()
+            parser.close()
+            yield from parser.links
 
     except requests.exceptions.RequestException as e:
         print("⚠️ Connection error:", e)
-        return valid_links
+
+
+def scrape_craigslist(
+    city: str = 'vancouver',
+    category: str = 'sub',
+    max_price: Optional[int] = None,
+    min_price: Optional[int] = None,
+    postal_code: Optional[str] = None,
+    search_distance: Optional[int] = None,
+    query: Optional[str] = None
+) -> List[str]:
+    """
+    Return all listing links from a Craigslist search (see iter_craigslist_links()
+    for the streaming version)
+    """
+    return list(iter_craigslist_links(
+        city=city,
+        category=category,
+        max_price=max_price,
+        min_price=min_price,
+        postal_code=postal_code,
+        search_distance=search_distance,
+        query=query
+    ))
+
+
+def process_listings_inline(links: List[str]):
+    """
+    Process listings one by one in this process (no worker pool), so a
+    profiler sees the extraction and storage hot path
+    """
+    # no commit timer: cProfile only instruments this thread, and commits
+    # run on a timer thread would be missing from the profile
+    writer = GroupCommitWriter(save_listings, max_records=group_writer.max_records, max_delay_ms=None)
+    for link in links:
+        update_listings_csv(link, writer=writer)
+    writer.flush()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Craigslist listings")
+    parser.add_argument('--profile', action='store_true', help="Profile the run (cProfile + flamegraph stacks)")
+    parser.add_argument('--profile-out', default='profile', help="Output file prefix for --profile")
+    args = parser.parse_args()
     
     # Example 2: Search for apartments within 5 miles of a specific postal code
     results = scrape_craigslist(
@@ -109,9 +176,11 @@ if __name__ == "__main__":
     )
 
     #To Do: Ask for prefrence of the user and add to later search in the text
-    for link in results:
-        update_listings_csv(link)
-        print(link)
+    if args.profile:
+        profile_run(process_listings_inline, results, output_prefix=args.profile_out)
+    else:
+        # fetch, parse, enrich and store run as separate stages
+        run_pipeline(results)
 
     # write an agent 
 
@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime
@@ -7,36 +6,50 @@ import numpy as np
 from PIL import Image
 import io
 import os
-from typing import Dict, Optional, List
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 import re
 import glob
 import json
+from geo_index import attach_coordinates
+from http_client import get_http_client
+from listing_record import Listing, ListingTable
+from change_history import ChangeHistory, diff_entries
+from listing_store import GroupCommitWriter, atomic_write_csv, atomic_write_json, store_lock
 
 # from smolagents_functions import prompt
 
 
-from smolagents import CodeAgent, LiteLLMModel
+from smolagents import LiteLLMModel
+from prompt_builder import (
+    TokenBudgetExceeded,
+    build_enrichment_messages,
+    estimate_call_tokens,
+    estimate_tokens,
+    parse_enrichment_reply,
+    token_budget,
+)
 
 # Create a basic model wrapper (e.g., Claude or GPT-4)
-model = LiteLLMModel(model_id="anthropic/claude-3-7-sonnet-latest")
-
-# Create the agent (no tools needed)
-agent = CodeAgent(
-    tools=[],  # No custom tools
-    model=model,
-    add_base_tools=True,  # Optional: gives access to built-in functions
+# LISTING_MODEL_ID / LISTING_MODEL_API_BASE point it elsewhere, e.g. at the load-test stub
+model = LiteLLMModel(
+    model_id=os.getenv("LISTING_MODEL_ID", "anthropic/claude-3-7-sonnet-latest"),
+    api_base=os.getenv("LISTING_MODEL_API_BASE"),
+    api_key=os.getenv("LISTING_MODEL_API_KEY"),
 )
 
-def get_current_csv_path() -> str:
+JSON_DATABASE_PATH = 'listings_database.json'
+CSV_PREFIX = 'craigslist_listings'
+
+def get_current_csv_path(csv_prefix: str = CSV_PREFIX) -> str:
     """
     Determine the appropriate CSV file path based on date and entry count rules.
-    Returns path in format: 'craigslist_listings_YYYY_MM_DD.csv'
+    Returns path in format: '<csv_prefix>_YYYY_MM_DD.csv'
     """
     today = datetime.now().strftime('%Y_%m_%d')
     
-    # Look for existing CSV files
-    existing_files = glob.glob('craigslist_listings_*.csv')
-    today_file = f'craigslist_listings_{today}.csv'
+    # Look for existing CSV files (only this prefix, not shard partitions)
+    existing_files = glob.glob(f'{csv_prefix}_[0-9][0-9][0-9][0-9]_[0-9][0-9]_[0-9][0-9].csv')
+    today_file = f'{csv_prefix}_{today}.csv'
     
     # If today's file exists, use it
     if today_file in existing_files:
@@ -86,7 +99,7 @@ def detect_watermark(image_url: str) -> bool:
     # use a VLM here 
     try:
         # Download image
-        response = requests.get(image_url)
+        response = get_http_client().get(image_url)
         img = Image.open(io.BytesIO(response.content))
         
         # Convert to OpenCV format
@@ -108,18 +121,121 @@ def detect_watermark(image_url: str) -> bool:
         print(f"Error processing image: {e}")
         return False
 
-def extract_listing_details(url: str) -> Dict[str, any]:
+def fetch_listing_html(url: str) -> str:
     """
-    Extract details from a Craigslist listing
+    Download the raw HTML of a Craigslist listing
     """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15'
     }
-    
+    # timeouts, retries and the dead-URL cache live in the shared client
+    response = get_http_client().get(url, headers=headers)
+    return response.text
+
+def extract_listing_details(url: str) -> Dict[str, any]:
+    """
+    Extract details from a Craigslist listing
+    """
+    try:
+        html = fetch_listing_html(url)
+    except Exception as e:
+        print(f"Error processing listing {url}: {e}")
+        return None
+
+    return parse_listing_html(html, url)
+
+def _parse_attrgroups(soup: BeautifulSoup, details: Dict[str, any]):
+    """
+    Fill details from the attribute groups (e.g. "2BR / 1Ba", "furnished")
+    """
+    attrgroups = soup.find_all('div', {'class': 'attrgroup'})
+    for attrgroup in attrgroups:
+        # spans = attrgroup.find_all('span', {'class': 'attr'})
+        spans = attrgroup.find_all('span', class_=['attr', 'valu'])
+
+        for span in spans:
+            text = span.text.strip().lower()
+            if 'br' in text:
+                try:
+                    details['rooms'] = int(text.split('br')[0].strip())
+                except:
+                    pass
+            elif 'utilities' in text:
+                details['utilities'] = True
+            elif 'ba' in text:
+                details['separate_bath'] = True
+            elif 'private bath' in text:
+                details['separate_bath'] = True
+            elif 'private kitchen' in text or 'separate kitchen' in text:
+                details['separate_kitchen'] = True
+            elif 'furnished' in text:
+                details['furnished'] = True
+            elif 'laundry' in text:
+                details['amenities'].append('laundry')
+            elif 'parking' in text:
+                details['parking'] = text
+            elif 'available' in text:
+                try:
+                    date_str = text.split('available')[1].strip()
+                    details['start_date'] = datetime.strptime(
+                        f"{date_str} {datetime.now().year}", 
+                        '%B %d %Y'
+                    ).strftime('%Y-%m-%d')
+                except:
+                    pass
+            elif 'weekly' in text or 'monthly' in text:
+                details['rent_period'] = text
+            elif text in ['apartment', 'house', 'condo', 'townhouse', 'duplex']:
+                details['housing_type'] = text
+
+def _parse_body_text(soup: BeautifulSoup, details: Dict[str, any]):
+    """
+    Fill details still missing from the posting body text
+    """
+    body = soup.find('section', {'id': 'postingbody'})
+    if body:
+        body_text = body.text.lower()
+        
+        # Check for room details in description
+        details['separate_bath'] = details['separate_bath'] or any(term in body_text for term in ['private bath', 'own bath', 'separate bath'])
+        details['separate_kitchen'] = details['separate_kitchen'] or any(term in body_text for term in ['private kitchen', 'own kitchen', 'separate kitchen'])
+        
+        # Try to extract number of rooms if not already found
+        if not details['rooms']:
+            room_patterns = [r'(\d+)\s*bed', r'(\d+)\s*room']
+            for pattern in room_patterns:
+                match = re.search(pattern, body_text)
+                if match:
+                    details['rooms'] = int(match.group(1))
+                    break
+        
+        # Try to extract start date if not already found
+        if not details['start_date']:
+            date_patterns = [
+                r'available\s+(\w+\s+\d{1,2})',
+                r'starting\s+(\w+\s+\d{1,2})',
+                r'from\s+(\w+\s+\d{1,2})'
+            ]
+            for pattern in date_patterns:
+                match = re.search(pattern, body_text)
+                if match:
+                    try:
+                        date_str = match.group(1)
+                        details['start_date'] = datetime.strptime(
+                            f"{date_str} {datetime.now().year}", 
+                            '%B %d %Y'
+                        ).strftime('%Y-%m-%d')
+                        break
+                    except ValueError:
+                        continue
+
+def parse_listing_html(html: str, url: str) -> Dict[str, any]:
+    """
+    Parse the HTML of a Craigslist listing into a details dictionary.
+    Pure CPU work with no network access, so it can run in a worker process.
+    """
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
         
         # Initialize details dictionary with new fields
         details = {
@@ -130,6 +246,8 @@ def extract_listing_details(url: str) -> Dict[str, any]:
             'separate_bath': None,
             'separate_kitchen': None,
             'neighborhood': None,
+            'latitude': None,
+            'longitude': None,
             'start_date': None,
             'num_images': 0,
             'description': None,
@@ -156,47 +274,18 @@ def extract_listing_details(url: str) -> Dict[str, any]:
         location_elem = soup.find('div', {'class': 'mapaddress'})
         if location_elem:
             details['neighborhood'] = location_elem.text.strip()
+
+        # Map coordinates, when the poster placed a pin
+        map_elem = soup.find('div', {'id': 'map'})
+        if map_elem:
+            try:
+                details['latitude'] = float(map_elem['data-latitude'])
+                details['longitude'] = float(map_elem['data-longitude'])
+            except (KeyError, ValueError):
+                pass
         
         # Extract attributes from the listing
-        attrgroups = soup.find_all('div', {'class': 'attrgroup'})
-        for attrgroup in attrgroups:
-            # spans = attrgroup.find_all('span', {'class': 'attr'})
-            spans = attrgroup.find_all('span', class_=['attr', 'valu'])
-
-            for span in spans:
-                text = span.text.strip().lower()
-                if 'br' in text:
-                    try:
-                        details['rooms'] = int(text.split('br')[0].strip())
-                    except:
-                        pass
-                elif 'utilities' in text:
-                    details['utilities'] = True
-                elif 'ba' in text:
-                    details['separate_bath'] = True
-                elif 'private bath' in text:
-                    details['separate_bath'] = True
-                elif 'private kitchen' in text or 'separate kitchen' in text:
-                    details['separate_kitchen'] = True
-                elif 'furnished' in text:
-                    details['furnished'] = True
-                elif 'laundry' in text:
-                    details['amenities'].append('laundry')
-                elif 'parking' in text:
-                    details['parking'] = text
-                elif 'available' in text:
-                    try:
-                        date_str = text.split('available')[1].strip()
-                        details['start_date'] = datetime.strptime(
-                            f"{date_str} {datetime.now().year}", 
-                            '%B %d %Y'
-                        ).strftime('%Y-%m-%d')
-                    except:
-                        pass
-                elif 'weekly' in text or 'monthly' in text:
-                    details['rent_period'] = text
-                elif text in ['apartment', 'house', 'condo', 'townhouse', 'duplex']:
-                    details['housing_type'] = text
+        _parse_attrgroups(soup, details)
         
         # Count images
         gallery = soup.find('div', {'id': 'thumbs'})
@@ -212,42 +301,7 @@ def extract_listing_details(url: str) -> Dict[str, any]:
                     details['has_watermark'] = False
         
         # Extract posting body text for additional information
-        body = soup.find('section', {'id': 'postingbody'})
-        if body:
-            body_text = body.text.lower()
-            
-            # Check for room details in description
-            details['separate_bath'] = details['separate_bath'] or any(term in body_text for term in ['private bath', 'own bath', 'separate bath'])
-            details['separate_kitchen'] = details['separate_kitchen'] or any(term in body_text for term in ['private kitchen', 'own kitchen', 'separate kitchen'])
-            
-            # Try to extract number of rooms if not already found
-            if not details['rooms']:
-                room_patterns = [r'(\d+)\s*bed', r'(\d+)\s*room']
-                for pattern in room_patterns:
-                    match = re.search(pattern, body_text)
-                    if match:
-                        details['rooms'] = int(match.group(1))
-                        break
-            
-            # Try to extract start date if not already found
-            if not details['start_date']:
-                date_patterns = [
-                    r'available\s+(\w+\s+\d{1,2})',
-                    r'starting\s+(\w+\s+\d{1,2})',
-                    r'from\s+(\w+\s+\d{1,2})'
-                ]
-                for pattern in date_patterns:
-                    match = re.search(pattern, body_text)
-                    if match:
-                        try:
-                            date_str = match.group(1)
-                            details['start_date'] = datetime.strptime(
-                                f"{date_str} {datetime.now().year}", 
-                                '%B %d %Y'
-                            ).strftime('%Y-%m-%d')
-                            break
-                        except ValueError:
-                            continue
+        _parse_body_text(soup, details)
 
         # Find h1 tag and get the next p tag
         h1_tag = soup.find('h1', class_=False)
@@ -268,13 +322,115 @@ def extract_listing_details(url: str) -> Dict[str, any]:
         return None
 
 
-def update_listings_csv(listing_url: str):
+def _token_usage(response, messages: List[Dict[str, any]]) -> tuple:
+    """
+    (input, output) token counts of a model call, estimated if the provider
+    doesn't report them
+    """
+    usage = getattr(response, 'token_usage', None)
+    if usage is not None:
+        return usage.input_tokens, usage.output_tokens
+    input_tokens = getattr(model, 'last_input_token_count', None)
+    output_tokens = getattr(model, 'last_output_token_count', None)
+    if input_tokens is not None and output_tokens is not None:
+        return input_tokens, output_tokens
+    prompt_text = ''.join(part['text'] for message in messages for part in message['content'])
+    return estimate_tokens(prompt_text), estimate_tokens(response.content or '')
+
+def enrich_listing_details(old_details: Dict[str, any]) -> Optional[Dict[str, any]]:
+    """
+    Ask the LLM to cross-check and complete the scraped details.
+    Once the run's token budget is used up the scraped details are returned as-is.
+    """
+    if not old_details:
+        return None
+
+    messages = build_enrichment_messages(old_details)
+    # reserved before the call, so parallel enrichers can't overshoot the budget together
+    try:
+        reserved = token_budget.reserve(estimate_call_tokens(messages, old_details))
+    except TokenBudgetExceeded as e:
+        print(f"Skipping enrichment of {old_details.get('link')}: {e}")
+        return old_details
+
+    try:
+        response = model(messages)
+    except Exception:
+        token_budget.release(reserved)
+        raise
+    input_tokens, output_tokens = _token_usage(response, messages)
+    token_budget.record(input_tokens, output_tokens, reserved)
+    print(f"Enriched {old_details.get('link')} ({input_tokens} in / {output_tokens} out tokens)")
+
+    try:
+        return parse_enrichment_reply(response.content, old_details)
+    except ValueError as e:
+        print(f"Error parsing enrichment for {old_details.get('link')}: {e}")
+        return old_details
+
+def save_listings(
+    listings: List[Dict[str, any]],
+    json_path: str = JSON_DATABASE_PATH,
+    csv_prefix: str = CSV_PREFIX
+) -> int:
+    """
+    Write a batch of enriched listings to the JSON database and the current CSV.
+    The JSON database and the CSV are each rewritten once per batch, atomically
+    and under the store lock, so concurrent runs don't overwrite each other.
+    Returns the number of listings written.
+
+    Args:
+        listings: Enriched listing dictionaries
+        json_path: JSON database (or shard partition) to write to
+        csv_prefix: Prefix of the daily CSV files to write to
+    """
+    if not listings:
+        return 0
+
+    for details in listings:
+        if isinstance(details, dict):
+            attach_coordinates(details)
+
+    # one lock per store covers both the JSON database and its CSVs
+    with store_lock(json_path):
+        saved, added = _merge_into_json_database(listings, json_path)
+        if not added:
+            return len(saved)
+
+        # only listings new to the database get a CSV row, so a link that an
+        # overlapping run (or an earlier batch) already stored isn't appended twice
+        csv_path = get_current_csv_path(csv_prefix)
+        df_new = pd.DataFrame(added)
+
+        # Load existing CSV or create new one
+        if os.path.exists(csv_path):
+            df_existing = pd.read_csv(csv_path)
+            df_updated = pd.concat([df_existing, df_new], ignore_index=True)
+        else:
+            df_updated = df_new
+
+        # Save updated DataFrame to CSV
+        atomic_write_csv(csv_path, df_updated)
+
+    print(f"Updated {csv_path} with {len(added)} listing(s)")
+    return len(saved)
+
+# Inserts from update_listings_csv are committed in groups, see listing_store.GroupCommitWriter
+group_writer = GroupCommitWriter(
+    save_listings,
+    max_records=int(os.getenv('LISTING_COMMIT_RECORDS', '20')),
+    max_delay_ms=float(os.getenv('LISTING_COMMIT_DELAY_MS', '2000')),
+)
+
+def update_listings_csv(listing_url: str, writer: Optional[GroupCommitWriter] = None):
     """
     Process a listing and update the appropriate CSV file,
-    handling duplicates and file size limits
+    handling duplicates and file size limits. The listing is committed
+    through `writer` (the shared group_writer by default).
     """
+    writer = writer or group_writer
     # Check for duplicates across all existing CSVs
-    if exists_duplicate_listing_json(listing_url):
+    if listing_url in writer.pending_links() or exists_duplicate_listing_json(listing_url):
         print(f"Duplicate listing found in JSON database, skipping: {listing_url}")
         return
     
@@ -282,69 +438,71 @@ def update_listings_csv(listing_url: str):
     old_details = extract_listing_details(listing_url)
 
     #add an agent that verified the cross checks the details
-
-    prompt = f"""
-        You are given a dictionary called `details` that describes an apartment listing, along with a free-text listing `description`.
-
-        Your task is to examine the `description` and update the fields in `details` to make them accurate.
-
-        Instructions:
-        1. For each key in the `details` dictionary:
-        - If the value is `None`, try to infer the correct value from the `description`.
-        - If the value is **not `None`**, check whether the value is correct based on the `description`.
-            - If it's correct, keep it.
-            - If it's incorrect, replace it with the correct value.
-            - If the description doesn't clearly support or contradict the value, leave it unchanged.
-
-        Here are the field definitions:
-        - price: Monthly rent (CAD), e.g., 1900
-        - rooms: Number of bedrooms (integer)
-        - separate_bath: True if the unit has a private bathroom, False otherwise
-        - separate_kitchen: True if there is a private kitchen, False otherwise
-        - neighborhood: Area or location mentioned, e.g., Kitsilano, Mount Pleasant (If exact address is given then don't update )
-        - start_date: Move-in date if mentioned
-        - housing_type: e.g., apartment, studio, basement
-        - rent_period: e.g., monthly, yearly, sublet, 6months, 4 months .., lease
-        - parking: e.g., included, street, none
-        - gym: True if gym is available
-        - dishwasher: True if unit includes a dishwasher
-        - utilities: e.g. Included, excluded: If yes, which ones: hydro, heat, hot water, internet, list all that are included 
-
-        Return the updated `details` dictionary with corrected or inferred values.
-
-        Here is the input dictionary:
-        {old_details}
-        """
-
-    details = agent.run(prompt)
-    print(details)
+    details = enrich_listing_details(old_details)
 
     if not details:
         print(f"Could not process listing: {listing_url}")
         return
     
-    # Update JSON database first
-    if not update_json_database(details):
-        print(f"Error updating JSON database: {listing_url}")
-        return  
-    
-    # If JSON update successful, update CSV
-    csv_path = get_current_csv_path()
-    
-    # Convert details to DataFrame
-    df_new = pd.DataFrame([details])
-    
-    # Load existing CSV or create new one
-    if os.path.exists(csv_path):
-        df_existing = pd.read_csv(csv_path)
-        df_updated = pd.concat([df_existing, df_new], ignore_index=True)
-    else:
-        df_updated = df_new
-    
-    # Save updated DataFrame to CSV
-    df_updated.to_csv(csv_path, index=False)
-    print(f"Successfully updated both JSON and CSV with listing: {listing_url}")
-    print(f"Updated {csv_path} with listing: {listing_url}")
+    writer.add(details)
+    print(f"Queued listing for the next group commit: {listing_url}")
+
+def refresh_listing(listing_url: str) -> bool:
+    """
+    Re-scrape a stored listing and update it in place; the fields that
+    changed since the last scrape are recorded in the change history.
+    Only the JSON database is updated, the CSVs keep the original row.
+    """
+    old_details = extract_listing_details(listing_url)
+    details = enrich_listing_details(old_details)
+    if not details:
+        print(f"Could not process listing: {listing_url}")
+        return False
+
+    # write back to whichever partition already holds the listing
+    json_path = next(
+        (path for path in get_json_partition_paths() if listing_url in load_json_database(path)),
+        JSON_DATABASE_PATH
+    )
+    return bool(update_json_database_batch([attach_coordinates(details)], json_path=json_path))
+
+def iter_listing_details(listing_urls: Iterable[str], enrich: bool = True) -> Iterator[Dict[str, any]]:
+    """
+    Yield each listing's details as soon as it has been extracted (and enriched),
+    so consumers can start on the first listing while later ones are still
+    being fetched. Listings already in the JSON database are skipped.
+
+    Args:
+        listing_urls: Listing URLs, e.g. from iter_craigslist_links()
+        enrich: Cross-check the details with the LLM before yielding them
+    """
+    known_links = set(load_merged_database().keys())
+    for listing_url in listing_urls:
+        if listing_url in known_links:
+            continue
+        known_links.add(listing_url)
+
+        details = extract_listing_details(listing_url)
+        if details and enrich:
+            details = enrich_listing_details(details)
+        if not details:
+            print(f"Could not process listing: {listing_url}")
+            continue
+        yield details
+
+def write_jsonl(records: Iterable[Dict[str, any]], jsonl_path: str = 'listings_stream.jsonl') -> Iterator[Dict[str, any]]:
+    """
+    Append each record to a JSON Lines file as it arrives and pass it on,
+    so the sink can sit in the middle of a stream:
+
+        for details in write_jsonl(iter_listing_details(links)):
+            notify(details)
+    """
+    with open(jsonl_path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            yield record
 
 def get_csv_stats():
     """
@@ -369,7 +527,7 @@ def get_csv_stats():
         except Exception as e:
             print(f"Error reading {csv_file}: {e}")
 
-def load_json_database(json_path: str = 'listings_database.json') -> Dict[str, any]:
+def load_json_database(json_path: str = JSON_DATABASE_PATH) -> Dict[str, any]:
     """
     Load existing JSON database or create new one if it doesn't exist
     """
@@ -382,30 +540,40 @@ def load_json_database(json_path: str = 'listings_database.json') -> Dict[str, a
         print(f"Error loading JSON database: {e}")
         return {}
 
-def save_json_database(data: Dict[str, any], json_path: str = 'listings_database.json'):
+def save_json_database(data: Dict[str, any], json_path: str = JSON_DATABASE_PATH):
     """
     Save updated database to JSON file
     """
     try:
-        with open(json_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        with store_lock(json_path):
+            atomic_write_json(json_path, data)
     except Exception as e:
         print(f"Error saving JSON database: {e}")
 
+def get_json_partition_paths(json_path: str = JSON_DATABASE_PATH) -> List[str]:
+    """
+    Return the JSON database followed by any shard partitions written next to it,
+    e.g. 'listings_database.json', 'listings_database.shard0.json', ...
+    """
+    root, ext = os.path.splitext(json_path)
+    return [json_path] + sorted(glob.glob(f'{root}.shard*{ext}'))
+
+def load_merged_database(json_path: str = JSON_DATABASE_PATH) -> Dict[str, any]:
+    """
+    Load the JSON database merged with all of its shard partitions
+    """
+    database = {}
+    for path in get_json_partition_paths(json_path):
+        database.update(load_json_database(path))
+    return database
+
 def exists_duplicate_listing_json(listing_url: str) -> bool:
     """
-    Check if the listing URL exists in the JSON database
+    Check if the listing URL exists in the JSON database or one of its partitions
     """
     try:
-        # if the file does not exists create a new one and return false
-        if not os.path.exists('listings_database.json'):
-            #create a new one
-            with open('listings_database.json', 'w') as f:
-                json.dump({}, f, indent=2)
-            return False
-        
-        with open('listings_database.json', 'r') as f:
-            database = json.load(f)
+        # a missing database loads as empty; it is created by the first locked write
+        database = load_merged_database()
 
         if listing_url in database:
             return True
@@ -415,6 +583,71 @@ def exists_duplicate_listing_json(listing_url: str) -> bool:
         print(f"Error checking duplicate listing in JSON database: {e}")
         return False
     
+def build_json_entry(listing_data: dict) -> dict:
+    """
+    Build the JSON database entry for a listing
+    """
+    # the field list and defaults live on the Listing record
+    return Listing.from_dict(listing_data).to_entry()
+
+def update_json_database_batch(listings: List[dict], json_path: str = JSON_DATABASE_PATH) -> List[dict]:
+    """
+    Add a batch of listings to the JSON database with a single read and write.
+    The read-modify-write runs under the store lock and replaces the file
+    atomically. Returns the listings that were written.
+    
+    Args:
+        listings: Dictionaries containing listing information including 'link' as the URL
+        json_path: JSON database (or shard partition) to write to
+    """
+    return _merge_into_json_database(listings, json_path)[0]
+
+def _merge_into_json_database(listings: List[dict], json_path: str) -> Tuple[List[dict], List[dict]]:
+    """
+    update_json_database_batch() that also returns which of the written
+    listings were not in the database before: (written, added)
+    """
+    try:
+        with store_lock(json_path):
+            # Load existing JSON database
+            database = load_json_database(json_path)
+
+            saved = []
+            added = []
+            changes = {}
+            for listing_data in listings:
+                if not isinstance(listing_data, dict) or not listing_data.get('link'):
+                    print(f"Skipping listing without a link: {listing_data}")
+                    continue
+                link = listing_data['link']
+                new_entry = build_json_entry(listing_data)
+                # a re-scraped listing: keep the fields that changed in the history
+                if link in database:
+                    changed = diff_entries(database[link], new_entry)
+                    if changed:
+                        changes[link] = changed
+                else:
+                    added.append(listing_data)
+                database[link] = new_entry
+                saved.append(listing_data)
+
+            # Save updated database with proper formatting
+            atomic_write_json(json_path, database)
+
+    except Exception as e:
+        print(f"Error updating JSON database: {e}")
+        return [], []
+
+    # The listings are stored at this point; losing their history must not
+    # make the caller treat them as unsaved
+    if changes:
+        try:
+            ChangeHistory().record(changes)
+        except Exception as e:
+            print(f"Error recording listing history: {e}")
+
+    return saved, added
+
 def update_json_database(listing_data: dict) -> bool:
     """
     Check if the listing URL exists in the JSON database and update it if not.
@@ -423,69 +656,34 @@ def update_json_database(listing_data: dict) -> bool:
     Args:
         listing_data: Dictionary containing listing information including 'link' as the URL
     """
-    try:
-        # Load existing JSON database
-        with open('listings_database.json', 'r') as f:
-            database = json.load(f)
-        
-        # Create new entry with all listing data
-        # update according to the new fields in the details dictionary
-        new_entry = {
-            'date_scraped': listing_data.get('date_scraped', datetime.now().strftime('%Y-%m-%d')),
-            'price': listing_data.get('price'),
-            'rooms': listing_data.get('rooms'),
-            'separate_bath': listing_data.get('separate_bath', False),
-            'separate_kitchen': listing_data.get('separate_kitchen', False),
-            'neighborhood': listing_data.get('neighborhood'),
-            'start_date': listing_data.get('start_date'),
-            'num_images': listing_data.get('num_images', 0),
-            'has_watermark': listing_data.get('has_watermark', False),
-            'description': listing_data.get('description'),
-            'housing_type': listing_data.get('housing_type'),
-            'rent_period': listing_data.get('rent_period'),
-            'amenities': listing_data.get('amenities', []),
-            'furnished': listing_data.get('furnished', False),
-            'parking': listing_data.get('parking'), 
-            'gym' : listing_data.get('gym'), #
-            'dishwasher': listing_data.get('dishwasher'),
-            'utilities': listing_data.get('utilities')
-        }
-        
-        # Add new entry to database
-        database[listing_data['link']] = new_entry
-        
-        # Save updated database with proper formatting
-        with open('listings_database.json', 'w') as f:
-            json.dump(database, f, indent=2)
-        
-        return True
-        
-    except Exception as e:
-        print(f"Error updating JSON database: {e}")
-        return False
+    return bool(update_json_database_batch([listing_data]))
 
 def get_json_stats():
     """
     Print statistics about the JSON database
     """
     try:
-        database = load_json_database()
+        # one partition at a time, so only that partition's dicts are in
+        # memory next to the table instead of the whole merged database
+        table = ListingTable()
+        for path in get_json_partition_paths():
+            table.extend(load_json_database(path))
         print("\nJSON Database Statistics:")
         print("-" * 50)
-        print(f"Total listings: {len(database)}")
+        print(f"Total listings: {len(table)}")
         
         # Get some basic stats
-        prices = [entry['price'] for entry in database.values() if entry.get('price')]
+        prices = [price for price in table.values('price') if price]
         if prices:
             print(f"Price range: ${min(prices)} - ${max(prices)}")
             print(f"Average price: ${sum(prices)/len(prices):.2f}")
         
         # Count listings with images
-        with_images = sum(1 for entry in database.values() if entry.get('num_images', 0) > 0)
+        with_images = sum(1 for count in table.values('num_images') if count > 0)
         print(f"Listings with images: {with_images}")
         
         # File size
-        file_size = os.path.getsize('listings_database.json') / 1024
+        file_size = sum(os.path.getsize(path) for path in get_json_partition_paths() if os.path.exists(path)) / 1024
         print(f"Database file size: {file_size:.2f} KB")
         
     except Exception as e:
@@ -498,6 +696,7 @@ if __name__ == "__main__":
     
     # Update CSV with new listing
     update_listings_csv(test_url)
+    group_writer.flush()
     
     # Print statistics about all CSV files
     get_csv_stats()
@@ -509,6 +708,7 @@ if __name__ == "__main__":
     ]
     for listing in listings:
         update_listings_csv(listing)
+    group_writer.flush()
 
     # Get statistics about both databases
     get_csv_stats()
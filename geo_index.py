@@ -0,0 +1,274 @@
+import csv
+import math
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+GAZETTEER_PATH = 'gazetteer.csv'
+EARTH_RADIUS_KM = 6371.0088
+
+# Offline gazetteer: normalized place name -> (latitude, longitude) of its centre.
+# Extend or override it with a 'gazetteer.csv' file (columns: name, latitude, longitude).
+GAZETTEER: Dict[str, Tuple[float, float]] = {
+    'vancouver': (49.2827, -123.1207),
+    'downtown': (49.2820, -123.1171),
+    'west end': (49.2856, -123.1340),
+    'coal harbour': (49.2900, -123.1230),
+    'yaletown': (49.2754, -123.1216),
+    'gastown': (49.2838, -123.1066),
+    'chinatown': (49.2799, -123.0999),
+    'strathcona': (49.2773, -123.0880),
+    'false creek': (49.2680, -123.1150),
+    'olympic village': (49.2700, -123.1070),
+    'fairview': (49.2633, -123.1300),
+    'kitsilano': (49.2684, -123.1683),
+    'mount pleasant': (49.2636, -123.1005),
+    'riley park': (49.2446, -123.1030),
+    'south cambie': (49.2466, -123.1209),
+    'shaughnessy': (49.2466, -123.1385),
+    'arbutus ridge': (49.2480, -123.1620),
+    'kerrisdale': (49.2341, -123.1553),
+    'dunbar': (49.2482, -123.1850),
+    'point grey': (49.2646, -123.2003),
+    'ubc': (49.2606, -123.2460),
+    'oakridge': (49.2269, -123.1166),
+    'marpole': (49.2097, -123.1300),
+    'sunset': (49.2190, -123.0900),
+    'victoria fraserview': (49.2200, -123.0650),
+    'killarney': (49.2180, -123.0380),
+    'kensington cedar cottage': (49.2470, -123.0720),
+    'renfrew collingwood': (49.2480, -123.0390),
+    'east vancouver': (49.2620, -123.0690),
+    'hastings sunrise': (49.2779, -123.0420),
+    'grandview woodland': (49.2760, -123.0680),
+    'burnaby': (49.2488, -122.9805),
+    'metrotown': (49.2276, -123.0076),
+    'brentwood': (49.2660, -123.0010),
+    'new westminster': (49.2057, -122.9110),
+    'north vancouver': (49.3200, -123.0724),
+    'lonsdale': (49.3190, -123.0720),
+    'west vancouver': (49.3286, -123.1602),
+    'richmond': (49.1666, -123.1336),
+    'coquitlam': (49.2838, -122.7932),
+    'port moody': (49.2849, -122.8678),
+    'surrey': (49.1913, -122.8490),
+}
+
+# Common spellings and abbreviations -> gazetteer name. No street names: streets
+# like Main or Cambie cross several neighbourhoods, so they can't stand for one.
+ALIASES: Dict[str, str] = {
+    'kits': 'kitsilano',
+    'mt pleasant': 'mount pleasant',
+    'downtown vancouver': 'downtown',
+    'vancouver downtown': 'downtown',
+    'dt': 'downtown',
+    'west point grey': 'point grey',
+    'university of british columbia': 'ubc',
+    'north van': 'north vancouver',
+    'west van': 'west vancouver',
+    'east van': 'east vancouver',
+    'new west': 'new westminster',
+    'the drive': 'grandview woodland',
+    'grandview': 'grandview woodland',
+    'cedar cottage': 'kensington cedar cottage',
+    'collingwood': 'renfrew collingwood',
+}
+
+# Names that only say which city a listing is in. Their centroid could be
+# kilometres from the listing, so they never produce coordinates.
+CITY_NAMES = {'vancouver'}
+
+
+def _load_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, Tuple[float, float]]:
+    """
+    Built-in gazetteer, extended with the entries from `path` if it exists
+    """
+    gazetteer = dict(GAZETTEER)
+    if os.path.exists(path):
+        try:
+            with open(path, newline='') as f:
+                for row in csv.DictReader(f):
+                    gazetteer[normalize_place(row['name'])] = (float(row['latitude']), float(row['longitude']))
+        except Exception as e:
+            print(f"Error loading gazetteer {path}: {e}")
+    return gazetteer
+
+
+def normalize_place(text: str) -> str:
+    """
+    Normalize a free-text neighbourhood/address for lookup,
+    e.g. 'Mt. Pleasant (Main St)' -> 'mt pleasant main street'
+    """
+    text = text.lower().replace('&', ' and ')
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    text = re.sub(r'\bst\b', 'street', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+_gazetteer = _load_gazetteer()
+# Longest names first so 'north vancouver' wins over 'vancouver'
+_place_pattern = re.compile(
+    r'\b(' + '|'.join(re.escape(name) for name in sorted(list(_gazetteer) + list(ALIASES), key=len, reverse=True)) + r')\b'
+)
+
+
+@lru_cache(maxsize=4096)
+def geocode(place: str) -> Optional[Tuple[float, float]]:
+    """
+    Look up (latitude, longitude) for a neighbourhood or address string
+    using the offline gazetteer. A neighbourhood anywhere in the string is
+    used over the city name, e.g. 'Vancouver, Kitsilano' -> Kitsilano.
+    Returns None if no known place, or only the city, is mentioned.
+    """
+    if not place:
+        return None
+    text = normalize_place(place)
+    name = ALIASES.get(text, text)
+    if name in _gazetteer:
+        return None if name in CITY_NAMES else _gazetteer[name]
+
+    for match in _place_pattern.finditer(text):
+        name = ALIASES.get(match.group(1), match.group(1))
+        if name not in CITY_NAMES:
+            return _gazetteer[name]
+    return None
+
+
+def attach_coordinates(details: Dict[str, any]) -> Dict[str, any]:
+    """
+    Fill in 'latitude'/'longitude' from the neighbourhood when the listing
+    page did not provide map coordinates
+    """
+    if details.get('latitude') is None or details.get('longitude') is None:
+        coordinates = geocode(details.get('neighborhood') or '')
+        if coordinates:
+            details['latitude'], details['longitude'] = coordinates
+    return details
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points in kilometres
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class SpatialIndex:
+    """
+    Grid index over listing coordinates for radius and bounding-box queries.
+
+    Points are bucketed into cells of `cell_deg` degrees; a query only looks
+    at the cells overlapping its bounding box.
+    """
+
+    def __init__(self, cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], List[Tuple[str, float, float]]] = defaultdict(list)
+        self.points: Dict[str, Tuple[float, float]] = {}
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def add(self, link: str, lat: float, lon: float):
+        """
+        Add or move a listing
+        """
+        if link in self.points:
+            self.remove(link)
+        self.points[link] = (lat, lon)
+        self.cells[self._cell(lat, lon)].append((link, lat, lon))
+
+    def remove(self, link: str):
+        """
+        Remove a listing from the index
+        """
+        point = self.points.pop(link, None)
+        if point:
+            cell = self._cell(*point)
+            self.cells[cell] = [entry for entry in self.cells[cell] if entry[0] != link]
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[str]:
+        """
+        Links of listings inside the bounding box
+        """
+        return [link for link, _, _ in self._bbox_entries(min_lat, min_lon, max_lat, max_lon)]
+
+    def _bbox_entries(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                for entry in self.cells.get((row, col), ()):
+                    _, lat, lon = entry
+                    if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                        yield entry
+
+    def radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[str, float]]:
+        """
+        (link, distance_km) of listings within `radius_km` of a point, nearest first
+        """
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        results = []
+        for link, plat, plon in self._bbox_entries(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            distance = haversine_km(lat, lon, plat, plon)
+            if distance <= radius_km:
+                results.append((link, distance))
+        results.sort(key=lambda item: item[1])
+        return results
+
+    def near(self, place: str, radius_km: float) -> List[Tuple[str, float]]:
+        """
+        Listings within `radius_km` of a named place, e.g. near('Kitsilano', 3)
+        """
+        coordinates = geocode(place)
+        if not coordinates:
+            print(f"Unknown place: {place}")
+            return []
+        return self.radius(coordinates[0], coordinates[1], radius_km)
+
+    @classmethod
+    def from_database(cls, database: Dict[str, Dict[str, any]], cell_deg: float = 0.01) -> 'SpatialIndex':
+        """
+        Build an index from a {link: entry} database, geocoding entries
+        stored before coordinates were recorded
+        """
+        index = cls(cell_deg)
+        for link, entry in database.items():
+            lat, lon = entry.get('latitude'), entry.get('longitude')
+            if lat is None or lon is None:
+                coordinates = geocode(entry.get('neighborhood') or '')
+                if not coordinates:
+                    continue
+                lat, lon = coordinates
+            index.add(link, lat, lon)
+        return index
+
+    @classmethod
+    def from_table(cls, table, cell_deg: float = 0.01) -> 'SpatialIndex':
+        """
+        Build an index from a listing_record.ListingTable
+        """
+        index = cls(cell_deg)
+        for link, lat, lon in table.coordinates():
+            index.add(link, lat, lon)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+
+if __name__ == "__main__":
+    from csv_extraction import load_merged_database
+
+    index = SpatialIndex.from_database(load_merged_database())
+    print(f"Indexed {len(index)} listing(s)")
+    for link, distance in index.near('Kitsilano', 3):
+        print(f"{distance:.2f} km  {link}")
@@ -0,0 +1,227 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+NEGATIVE_CACHE_PATH = 'negative_cache.json'
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.1 Safari/605.1.15'
+}
+
+# Status codes worth retrying; 404/410 mean the posting is gone for good
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DEAD_STATUS = {404, 410}
+
+
+class DeadUrlError(requests.exceptions.RequestException):
+    """
+    The URL returned 404/410 recently and is in the negative cache
+    """
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Too many recent failures for this host, requests are short-circuited
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After `failure_threshold` consecutive failures the host is "open" and
+    requests fail immediately for `reset_timeout` seconds. After that a
+    single trial request is let through; success closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at >= self.reset_timeout:
+                # half-open: let one trial request through
+                self._opened_at[host] = time.monotonic()
+                return True
+            return False
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+
+    def record_failure(self, host: str):
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                self._opened_at[host] = time.monotonic()
+
+
+class NegativeCache:
+    """
+    Persistent set of dead URLs (404/410) that expire after `ttl` seconds
+    """
+
+    def __init__(self, cache_path: str = NEGATIVE_CACHE_PATH, ttl: float = 7 * 24 * 3600):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading negative cache: {e}")
+        return {}
+
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(url)
+            if expires_at is None:
+                return False
+            if expires_at < time.time():
+                del self._entries[url]
+                return False
+            return True
+
+    def add(self, url: str):
+        with self._lock:
+            # merge with what other processes have written since we loaded
+            entries = self._load()
+            entries.update(self._entries)
+            entries[url] = time.time() + self.ttl
+            now = time.time()
+            self._entries = {key: value for key, value in entries.items() if value >= now}
+            try:
+                tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp_path, self.cache_path)
+            except Exception as e:
+                print(f"Error saving negative cache: {e}")
+
+
+class HttpClient:
+    """
+    Shared HTTP client with timeouts, retries with jittered exponential
+    backoff, a per-host circuit breaker and a negative cache for dead URLs.
+    Failures raise requests exceptions, like requests.get() does.
+    """
+
+    def __init__(
+        self,
+        timeout: tuple = (5, 20),
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+        breaker: Optional[CircuitBreaker] = None,
+        negative_cache: Optional[NegativeCache] = None
+    ):
+        """
+        Args:
+            timeout: (connect, read) timeout in seconds
+            max_retries: Retries after the first attempt
+            backoff_base: Backoff before the first retry, doubled on each retry
+            backoff_max: Upper bound for a single backoff
+            breaker: Circuit breaker shared between requests
+            negative_cache: Cache of URLs known to be dead
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.negative_cache = negative_cache or NegativeCache()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        # one session (connection pool) per thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            self._local.session = session
+        return session
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # "full jitter": spread retries of many workers over the whole window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET `url` and return a successful response, retrying transient errors.
+
+        Raises:
+            DeadUrlError: the URL is (or just turned out to be) 404/410
+            CircuitOpenError: the host has failed too often recently
+            requests.exceptions.RequestException: retries exhausted
+        """
+        if self.negative_cache.contains(url):
+            raise DeadUrlError(f"Known dead URL: {url}")
+
+        host = urlparse(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow(host):
+                raise CircuitOpenError(f"Circuit open for {host}")
+
+            retry_after = None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.breaker.record_failure(host)
+                error = e
+            else:
+                if response.status_code in DEAD_STATUS:
+                    self.breaker.record_success(host)
+                    self.negative_cache.add(url)
+                    response.close()
+                    raise DeadUrlError(f"{response.status_code} for {url}", response=response)
+                if response.status_code not in RETRY_STATUS:
+                    self.breaker.record_success(host)
+                    response.raise_for_status()
+                    return response
+                self.breaker.record_failure(host)
+                retry_after = response.headers.get('Retry-After')
+                error = requests.exceptions.HTTPError(f"{response.status_code} for {url}", response=response)
+                response.close()
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+
+        raise error
+
+
+_default_client: Optional[HttpClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """
+    Process-wide shared HttpClient
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
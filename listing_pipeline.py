@@ -0,0 +1,300 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from prompt_builder import token_budget
+
+# Marks the end of the work stream on a queue
+_DONE = object()
+
+
+class PipelineStages:
+    """
+    The functions run by each stage of the pipeline
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], str],
+        parse: Callable[[str, str], Optional[Dict[str, any]]],
+        enrich: Callable[[Dict[str, any]], Optional[Dict[str, any]]],
+        save: Callable[[List[Dict[str, any]]], int],
+        known_links: Callable[[], Iterable[str]]
+    ):
+        """
+        Args:
+            fetch: Downloads a listing page, url -> html
+            parse: Extracts the details, (html, url) -> details; must be picklable for the process pool
+            enrich: Cross-checks the details with the LLM
+            save: Stores a batch of listings and returns the number stored
+            known_links: Links already stored, which are skipped
+        """
+        self.fetch = fetch
+        self.parse = parse
+        self.enrich = enrich
+        self.save = save
+        self.known_links = known_links
+
+
+def listing_stages() -> PipelineStages:
+    """
+    Stages that scrape, enrich and store Craigslist listings
+    """
+    # imported here so the pipeline can run (and be tested) with other stages
+    # without loading the scraping and LLM libraries
+    from csv_extraction import (
+        enrich_listing_details,
+        fetch_listing_html,
+        load_merged_database,
+        parse_listing_html,
+        save_listings,
+    )
+    return PipelineStages(
+        fetch=fetch_listing_html,
+        parse=parse_listing_html,
+        enrich=enrich_listing_details,
+        save=save_listings,
+        known_links=lambda: load_merged_database().keys()
+    )
+
+
+class StageStats:
+    """
+    Per-stage latency samples (seconds) collected during a pipeline run
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def add(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def percentile(self, stage: str, pct: float) -> float:
+        values = sorted(self.samples.get(stage, ()))
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+        return values[index]
+
+    def report(self) -> str:
+        lines = [f"{'stage':<8} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}"]
+        for stage in ('search', 'fetch', 'parse', 'enrich', 'store'):
+            if stage in self.samples:
+                lines.append(
+                    f"{stage:<8} {len(self.samples[stage]):>7} "
+                    f"{self.percentile(stage, 50) * 1000:>9.1f} {self.percentile(stage, 99) * 1000:>9.1f}"
+                )
+        return '\n'.join(lines)
+
+
+async def _feed_urls(urls: Iterable[str], out_queue: asyncio.Queue, known_links: set, rate: Optional[float]):
+    """
+    Put new listing URLs on the fetch queue, skipping ones already stored.
+    With `rate` set, URLs are released at most `rate` per second.
+    """
+    next_at = time.monotonic()
+    for url in urls:
+        if url in known_links:
+            print(f"Duplicate listing found in JSON database, skipping: {url}")
+            continue
+        known_links.add(url)
+        if rate:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_at = max(next_at, time.monotonic()) + 1 / rate
+        await out_queue.put(url)
+
+
+async def _fetch_worker(fetch: Callable, in_queue: asyncio.Queue, out_queue: asyncio.Queue, stats: StageStats):
+    """
+    Download listing pages (I/O-bound, runs in the thread pool)
+    """
+    while True:
+        url = await in_queue.get()
+        if url is _DONE:
+            return
+        start = time.perf_counter()
+        try:
+            html = await asyncio.to_thread(fetch, url)
+        except Exception as e:
+            print(f"Error processing listing {url}: {e}")
+            continue
+        finally:
+            stats.add('fetch', time.perf_counter() - start)
+        await out_queue.put((url, html))
+
+
+async def _parse_worker(parse: Callable, in_queue: asyncio.Queue, out_queue: asyncio.Queue, pool: Executor, stats: StageStats):
+    """
+    Parse listing HTML (CPU-bound, runs in the process pool)
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await in_queue.get()
+        if item is _DONE:
+            return
+        url, html = item
+        start = time.perf_counter()
+        try:
+            details = await loop.run_in_executor(pool, parse, html, url)
+        except Exception as e:
+            print(f"Error parsing listing {url}: {e}")
+            continue
+        finally:
+            stats.add('parse', time.perf_counter() - start)
+        if details:
+            await out_queue.put(details)
+
+
+async def _enrich_worker(enrich: Callable, in_queue: asyncio.Queue, out_queue: asyncio.Queue, stats: StageStats):
+    """
+    Cross-check the parsed details with the LLM (high latency, runs in the thread pool)
+    """
+    while True:
+        old_details = await in_queue.get()
+        if old_details is _DONE:
+            return
+        start = time.perf_counter()
+        try:
+            details = await asyncio.to_thread(enrich, old_details)
+        except Exception as e:
+            print(f"Error enriching listing {old_details.get('link')}: {e}")
+            continue
+        finally:
+            stats.add('enrich', time.perf_counter() - start)
+        if not details:
+            print(f"Could not process listing: {old_details.get('link')}")
+            continue
+        await out_queue.put(details)
+
+
+async def _store_writer(save: Callable, in_queue: asyncio.Queue, batch_size: int, flush_interval: float, stats: StageStats) -> int:
+    """
+    Single writer that saves enriched listings in batches of `batch_size`,
+    or whatever has arrived after `flush_interval` seconds. A batch that
+    fails to save is logged and dropped; the writer keeps draining the queue
+    so the stages upstream never block on it.
+    """
+    stored = 0
+    batch: List[Dict[str, any]] = []
+    done = False
+    while not done:
+        try:
+            details = await asyncio.wait_for(in_queue.get(), timeout=flush_interval)
+        except asyncio.TimeoutError:
+            details = None
+        if details is _DONE:
+            done = True
+        elif details is not None:
+            batch.append(details)
+
+        if batch and (done or details is None or len(batch) >= batch_size):
+            start = time.perf_counter()
+            try:
+                stored += await asyncio.to_thread(save, batch)
+            except Exception as e:
+                print(f"Error storing {len(batch)} listing(s): {e}")
+            stats.add('store', time.perf_counter() - start)
+            batch = []
+    return stored
+
+
+async def _run_stage(workers: List[asyncio.Task], out_queue: asyncio.Queue, downstream_workers: int):
+    """
+    Wait for every worker of a stage to finish, then tell the next stage to stop
+    """
+    await asyncio.gather(*workers)
+    for _ in range(downstream_workers):
+        await out_queue.put(_DONE)
+
+
+async def run_pipeline_async(
+    urls: Iterable[str],
+    fetch_workers: int = 8,
+    parse_workers: Optional[int] = None,
+    enrich_workers: int = 4,
+    queue_size: int = 32,
+    batch_size: int = 20,
+    flush_interval: float = 2.0,
+    rate: Optional[float] = None,
+    stats: Optional[StageStats] = None,
+    stages: Optional[PipelineStages] = None,
+    parse_executor: Optional[Executor] = None
+) -> int:
+    """
+    Run listing URLs through the fetch -> parse -> enrich -> store stages.
+
+    Stages are connected by bounded queues of `queue_size` items, so a slow
+    stage blocks the ones upstream of it instead of letting work pile up in
+    memory. Returns the number of listings stored.
+
+    Args:
+        urls: Listing URLs to process
+        fetch_workers: Concurrent page downloads
+        parse_workers: Parser processes (defaults to the number of CPUs)
+        enrich_workers: Concurrent LLM enrichment calls
+        queue_size: Maximum number of items waiting between two stages
+        batch_size: Number of listings per storage write
+        flush_interval: Seconds to wait before writing a partial batch
+        rate: Maximum listing URLs released per second (no limit if None)
+        stats: Collects per-stage latencies when given
+        stages: Functions run by the stages (defaults to listing_stages())
+        parse_executor: Runs the parse stage (defaults to a process pool of `parse_workers`)
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    stats = stats if stats is not None else StageStats()
+    stages = stages or listing_stages()
+
+    # to_thread() runs on the default executor, size it for the I/O stages
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=fetch_workers + enrich_workers + 1))
+
+    url_queue = asyncio.Queue(maxsize=queue_size)
+    html_queue = asyncio.Queue(maxsize=queue_size)
+    parsed_queue = asyncio.Queue(maxsize=queue_size)
+    enriched_queue = asyncio.Queue(maxsize=queue_size)
+
+    known_links = set(stages.known_links())
+
+    pool = parse_executor or ProcessPoolExecutor(max_workers=parse_workers)
+    try:
+        writer = asyncio.create_task(_store_writer(stages.save, enriched_queue, batch_size, flush_interval, stats))
+        fetchers = [asyncio.create_task(_fetch_worker(stages.fetch, url_queue, html_queue, stats)) for _ in range(fetch_workers)]
+        parsers = [asyncio.create_task(_parse_worker(stages.parse, html_queue, parsed_queue, pool, stats)) for _ in range(parse_workers)]
+        enrichers = [asyncio.create_task(_enrich_worker(stages.enrich, parsed_queue, enriched_queue, stats)) for _ in range(enrich_workers)]
+
+        tasks = [
+            asyncio.create_task(_run_stage([asyncio.create_task(_feed_urls(urls, url_queue, known_links, rate))], url_queue, fetch_workers)),
+            asyncio.create_task(_run_stage(fetchers, html_queue, parse_workers)),
+            asyncio.create_task(_run_stage(parsers, parsed_queue, enrich_workers)),
+            asyncio.create_task(_run_stage(enrichers, enriched_queue, 1)),
+            writer,
+        ]
+        # a stage or the writer dying would leave the others blocked on a
+        # queue forever, so the first failure cancels everything and is raised
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        stored = writer.result()
+    finally:
+        if parse_executor is None:
+            pool.shutdown()
+
+    print(f"Pipeline stored {stored} listing(s)")
+    print(token_budget.summary())
+    return stored
+
+
+def run_pipeline(urls: Iterable[str], **kwargs) -> int:
+    """
+    Synchronous entry point for run_pipeline_async()
+    """
+    return asyncio.run(run_pipeline_async(urls, **kwargs))
@@ -0,0 +1,269 @@
+import math
+import re
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Fields stored for every listing, in database order ('link' is the database key)
+LISTING_FIELDS = (
+    'date_scraped',
+    'price',
+    'rooms',
+    'separate_bath',
+    'separate_kitchen',
+    'neighborhood',
+    'latitude',
+    'longitude',
+    'start_date',
+    'num_images',
+    'has_watermark',
+    'description',
+    'housing_type',
+    'rent_period',
+    'amenities',
+    'furnished',
+    'parking',
+    'gym',
+    'dishwasher',
+    'utilities',
+)
+
+# Values used when a field is missing from the scraped details
+FIELD_DEFAULTS = {
+    'separate_bath': False,
+    'separate_kitchen': False,
+    'num_images': 0,
+    'has_watermark': False,
+    'amenities': [],
+    'furnished': False,
+}
+
+# Low-cardinality string fields, interned so equal values share one object
+_INTERNED_FIELDS = ('date_scraped', 'neighborhood', 'start_date', 'housing_type', 'rent_period', 'parking')
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# A number with optional thousands separators and decimals, e.g. '1,900.00'
+_NUMBER = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?')
+
+
+def _to_int(value) -> Optional[int]:
+    """
+    int() for scraped/LLM values such as 1900, 1900.0, '$1,900.00' or
+    '$1900-$2100' (the first number wins); None if not a number
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if math.isfinite(value) else None
+    match = _NUMBER.search(str(value))
+    return int(float(match.group().replace(',', ''))) if match else None
+
+
+def _to_list(value) -> List:
+    """
+    Amenities as a list; a single value (e.g. the LLM replying with the
+    string 'laundry, balcony') is wrapped, not split into characters
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+class Listing:
+    """
+    One listing record. Uses __slots__ instead of a per-instance dict, which
+    makes each record several times smaller than the equivalent dict.
+    """
+
+    __slots__ = ('link',) + LISTING_FIELDS
+
+    def __init__(self, link: str, **fields):
+        self.link = link
+        for field in LISTING_FIELDS:
+            value = fields.get(field, FIELD_DEFAULTS.get(field))
+            if field in _INTERNED_FIELDS:
+                value = _intern(value)
+            elif field == 'amenities':
+                value = _to_list(value)
+            setattr(self, field, value)
+        if self.date_scraped is None:
+            self.date_scraped = _intern(datetime.now().strftime('%Y-%m-%d'))
+
+    @classmethod
+    def from_dict(cls, details: Dict[str, any], link: Optional[str] = None) -> 'Listing':
+        """
+        Build a record from scraped details or a database entry
+        """
+        return cls(link or details.get('link'), **{field: details[field] for field in LISTING_FIELDS if field in details})
+
+    def to_entry(self) -> Dict[str, any]:
+        """
+        JSON database entry (every field except the link)
+        """
+        return {field: getattr(self, field) for field in LISTING_FIELDS}
+
+    def to_dict(self) -> Dict[str, any]:
+        """
+        Details dictionary including the link, as used by the pipeline
+        """
+        details = {'link': self.link}
+        details.update(self.to_entry())
+        return details
+
+    def __repr__(self) -> str:
+        return f'Listing({self.link!r}, price={self.price!r}, neighborhood={self.neighborhood!r})'
+
+
+class ListingTable:
+    """
+    Columnar in-memory table of listings.
+
+    Numbers and flags live in typed arrays (-1 / NaN mark missing values),
+    neighbourhoods are dictionary-encoded, and repeated strings are interned,
+    so a large database costs a fraction of the memory of a dict of dicts and
+    column scans (stats, filters) don't touch the other fields.
+    """
+
+    MISSING = -1
+    FLAG_FIELDS = ('separate_bath', 'separate_kitchen', 'has_watermark', 'furnished', 'gym', 'dishwasher')
+    INT_FIELDS = ('price', 'rooms', 'num_images')
+    FLOAT_FIELDS = ('latitude', 'longitude')
+    OBJECT_FIELDS = ('date_scraped', 'start_date', 'description', 'housing_type', 'rent_period', 'amenities', 'parking', 'utilities')
+
+    def __init__(self):
+        self.links: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self.columns: Dict[str, any] = {}
+        for field in self.INT_FIELDS:
+            self.columns[field] = array('i')
+        for field in self.FLOAT_FIELDS:
+            self.columns[field] = array('d')
+        for field in self.FLAG_FIELDS:
+            self.columns[field] = array('b')
+        for field in self.OBJECT_FIELDS:
+            self.columns[field] = []
+        self.neighborhood_codes = array('i')
+        self.neighborhood_names: List[Optional[str]] = []
+        self._neighborhood_index: Dict[Optional[str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def __contains__(self, link: str) -> bool:
+        return link in self._row_of
+
+    def _neighborhood_code(self, name: Optional[str]) -> int:
+        code = self._neighborhood_index.get(name)
+        if code is None:
+            code = len(self.neighborhood_names)
+            self.neighborhood_names.append(_intern(name))
+            self._neighborhood_index[name] = code
+        return code
+
+    def append(self, listing: Listing):
+        """
+        Add a listing, or replace the row of a listing with the same link
+        """
+        values = self._encode(listing)
+        row = self._row_of.get(listing.link)
+        if row is None:
+            self._row_of[listing.link] = len(self.links)
+            self.links.append(listing.link)
+            for field, value in values.items():
+                self.columns[field].append(value)
+            self.neighborhood_codes.append(self._neighborhood_code(listing.neighborhood))
+        else:
+            for field, value in values.items():
+                self.columns[field][row] = value
+            self.neighborhood_codes[row] = self._neighborhood_code(listing.neighborhood)
+
+    def _encode(self, listing: Listing) -> Dict[str, any]:
+        values = {}
+        for field in self.INT_FIELDS:
+            number = _to_int(getattr(listing, field))
+            # array('i') holds 32-bit values; anything else is treated as garbage
+            values[field] = number if number is not None and 0 <= number < 2 ** 31 else self.MISSING
+        for field in self.FLOAT_FIELDS:
+            number = getattr(listing, field)
+            values[field] = float(number) if isinstance(number, (int, float)) else math.nan
+        for field in self.FLAG_FIELDS:
+            flag = getattr(listing, field)
+            values[field] = self.MISSING if flag is None else int(bool(flag))
+        for field in self.OBJECT_FIELDS:
+            value = getattr(listing, field)
+            if field == 'amenities':
+                value = tuple(_intern(item) for item in value) if value else ()
+            elif field in _INTERNED_FIELDS:
+                value = _intern(value)
+            values[field] = value
+        return values
+
+    def row(self, index: int) -> Listing:
+        """
+        Materialize one row as a Listing record
+        """
+        fields = {}
+        for field in self.INT_FIELDS + self.FLAG_FIELDS:
+            value = self.columns[field][index]
+            if value == self.MISSING:
+                value = None
+            elif field in self.FLAG_FIELDS:
+                value = bool(value)
+            fields[field] = value
+        for field in self.FLOAT_FIELDS:
+            value = self.columns[field][index]
+            fields[field] = None if math.isnan(value) else value
+        for field in self.OBJECT_FIELDS:
+            fields[field] = self.columns[field][index]
+        fields['amenities'] = list(fields['amenities'])
+        fields['neighborhood'] = self.neighborhood_names[self.neighborhood_codes[index]]
+        return Listing(self.links[index], **fields)
+
+    def get(self, link: str) -> Optional[Listing]:
+        row = self._row_of.get(link)
+        return None if row is None else self.row(row)
+
+    def __iter__(self) -> Iterator[Listing]:
+        for index in range(len(self.links)):
+            yield self.row(index)
+
+    def values(self, field: str) -> List:
+        """
+        Non-missing values of a numeric or flag column
+        """
+        column = self.columns[field]
+        if field in self.FLOAT_FIELDS:
+            return [value for value in column if not math.isnan(value)]
+        return [value for value in column if value != self.MISSING]
+
+    def coordinates(self) -> Iterator[Tuple[str, float, float]]:
+        """
+        (link, latitude, longitude) of every listing that has coordinates
+        """
+        for link, lat, lon in zip(self.links, self.columns['latitude'], self.columns['longitude']):
+            if not (math.isnan(lat) or math.isnan(lon)):
+                yield link, lat, lon
+
+    @classmethod
+    def from_database(cls, database: Dict[str, Dict[str, any]]) -> 'ListingTable':
+        """
+        Build a table from a {link: entry} JSON database
+        """
+        table = cls()
+        table.extend(database)
+        return table
+
+    def extend(self, database: Dict[str, Dict[str, any]]):
+        """
+        Append the entries of a {link: entry} JSON database (or partition);
+        entries replace rows with the same link
+        """
+        for link, entry in database.items():
+            self.append(Listing.from_dict(entry, link=link))
@@ -0,0 +1,169 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+
+class _StoreLock:
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self.rlock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+
+_locks: Dict[str, _StoreLock] = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def store_lock(path: str):
+    """
+    Exclusive lock on a store file, held across processes (advisory flock on
+    '<path>.lock') and threads. Re-entrant within a process, so a function
+    holding the lock can call others that take it too.
+    """
+    lock_path = os.path.abspath(path) + '.lock'
+    with _locks_guard:
+        lock = _locks.setdefault(lock_path, _StoreLock(lock_path))
+
+    with lock.rlock:
+        if lock.depth == 0:
+            lock.file = open(lock_path, 'a')
+            if fcntl:
+                fcntl.flock(lock.file.fileno(), fcntl.LOCK_EX)
+        lock.depth += 1
+        try:
+            yield
+        finally:
+            lock.depth -= 1
+            if lock.depth == 0:
+                if fcntl:
+                    fcntl.flock(lock.file.fileno(), fcntl.LOCK_UN)
+                lock.file.close()
+                lock.file = None
+
+
+def _atomic_replace(path: str, write: Callable):
+    """
+    Call write(f) on a temp file next to `path`, then rename it over `path`,
+    so readers see either the old or the new file, never a partial one
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path: str, data, indent: int = 2):
+    """
+    Write JSON to `path` with a write-rename
+    """
+    _atomic_replace(path, lambda f: json.dump(data, f, indent=indent))
+
+
+def atomic_write_csv(path: str, df):
+    """
+    Write a DataFrame to `path` with a write-rename
+    """
+    _atomic_replace(path, lambda f: df.to_csv(f, index=False))
+
+
+class GroupCommitWriter:
+    """
+    Gathers listings and commits them together: once `max_records` are
+    waiting or the oldest has waited `max_delay_ms`, whichever comes first.
+    One commit means one locked read-modify-write of the store instead of
+    one per listing.
+    """
+
+    def __init__(self, commit: Callable[[List[Dict[str, any]]], int], max_records: int = 20, max_delay_ms: Optional[float] = 2000):
+        """
+        Args:
+            commit: Writes a batch and returns the number stored, e.g. save_listings
+            max_records: Flush when this many listings are waiting
+            max_delay_ms: Flush when the oldest waiting listing is this old. With None
+                there is no timer and every commit runs on the thread calling add()/flush()
+        """
+        self.commit = commit
+        self.max_records = max_records
+        self.max_delay_ms = max_delay_ms
+        self.pending: List[Dict[str, any]] = []
+        # batches taken out of `pending` whose commit hasn't finished yet
+        self.committing: List[List[Dict[str, any]]] = []
+        self.committed = 0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
+
+    def pending_links(self) -> set:
+        """
+        Links waiting to be committed, including those of a commit in progress
+        """
+        with self._lock:
+            waiting = self.pending + [details for batch in self.committing for details in batch]
+            return {details.get('link') for details in waiting}
+
+    def add(self, details: Dict[str, any]):
+        """
+        Queue a listing; commits the group if it is full
+        """
+        with self._lock:
+            self.pending.append(details)
+            full = len(self.pending) >= self.max_records
+            if not full and self._timer is None and self.max_delay_ms is not None:
+                self._timer = threading.Timer(self.max_delay_ms / 1000, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Commit everything waiting now; returns the number of listings stored.
+        If the commit fails the listings are put back and go out with the
+        next commit.
+        """
+        with self._lock:
+            batch, self.pending = self.pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if batch:
+                self.committing.append(batch)
+        if not batch:
+            return 0
+        start = time.perf_counter()
+        try:
+            stored = self.commit(batch)
+        except Exception as e:
+            # flush() often runs on the timer thread, where a raised
+            # exception would be printed and the batch lost
+            print(f"Group commit of {len(batch)} listing(s) failed, keeping them for the next commit: {e}")
+            with self._lock:
+                self.pending[:0] = batch
+            return 0
+        finally:
+            with self._lock:
+                self.committing.remove(batch)
+        with self._lock:
+            self.committed += stored
+        print(f"Group commit: {stored}/{len(batch)} listing(s) in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return stored
@@ -0,0 +1,107 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+
+def _serve(config_kwargs: dict, port_queue):
+    """
+    Run the mock server in its own process so it doesn't compete with the
+    pipeline for the GIL
+    """
+    from mock_craigslist_server import MockConfig, start_server
+
+    server = start_server(MockConfig(**config_kwargs))
+    port_queue.put(server.server_port)
+    while True:
+        time.sleep(3600)
+
+
+def _peak_memory_mb() -> tuple:
+    """
+    Peak resident memory of this process and of its (finished) children, in MB
+    """
+    # ru_maxrss is in KB on Linux
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return self_kb / 1024, children_kb / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load test against a local mock Craigslist and stub LLM")
+    parser.add_argument('--listings', type=int, default=200, help="Listings on the mock search page")
+    parser.add_argument('--rate', type=float, default=None, help="Target listing requests per second (default: unlimited)")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Mock page latency")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="Mock page latency jitter")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of listing requests answered with 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Fraction of listing requests answered with 429")
+    parser.add_argument('--dead-rate', type=float, default=0.0, help="Fraction of listing requests answered with 404")
+    parser.add_argument('--llm-latency-ms', type=float, default=300, help="Stub LLM latency")
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--parse-workers', type=int, default=None)
+    parser.add_argument('--enrich-workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--workdir', default=None, help="Where the run writes its JSON/CSV (default: a temp dir)")
+    args = parser.parse_args()
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=_serve,
+        args=({
+            'listings_per_search': args.listings,
+            'page_latency_ms': args.latency_ms,
+            'latency_jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+            'throttle_rate': args.throttle_rate,
+            'dead_rate': args.dead_rate,
+            'llm_latency_ms': args.llm_latency_ms,
+        }, port_queue),
+        daemon=True
+    )
+    server.start()
+    base_url = f'http://127.0.0.1:{port_queue.get(timeout=10)}'
+
+    # must be set before csv_extraction creates its model
+    os.environ['CRAIGSLIST_BASE_URL'] = base_url
+    os.environ['LISTING_MODEL_ID'] = 'openai/stub'
+    os.environ['LISTING_MODEL_API_BASE'] = f'{base_url}/v1'
+    os.environ['LISTING_MODEL_API_KEY'] = 'stub'
+
+    # keep the run's database, CSVs and caches away from the real ones
+    workdir = args.workdir or tempfile.mkdtemp(prefix='craigslist_load_test_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    from craigs_list_beatiful_sup import iter_craigslist_links
+    from listing_pipeline import StageStats, run_pipeline
+
+    stats = StageStats()
+    started = time.perf_counter()
+
+    search_start = time.perf_counter()
+    links = list(iter_craigslist_links())
+    stats.add('search', time.perf_counter() - search_start)
+
+    stored = run_pipeline(
+        links,
+        fetch_workers=args.fetch_workers,
+        parse_workers=args.parse_workers,
+        enrich_workers=args.enrich_workers,
+        batch_size=args.batch_size,
+        rate=args.rate,
+        stats=stats
+    )
+    elapsed = time.perf_counter() - started
+    server.terminate()
+
+    self_mb, children_mb = _peak_memory_mb()
+    print("\nLoad test results")
+    print("-" * 50)
+    print(f"Mock server: {base_url}, output in {workdir}")
+    print(f"Listings found: {len(links)}, stored: {stored}")
+    print(f"Wall time: {elapsed:.2f} s")
+    print(f"Throughput: {stored / elapsed:.2f} listings/sec")
+    print(stats.report())
+    print(f"Peak memory: {self_mb:.1f} MB (driver), {children_mb:.1f} MB (largest child process)")
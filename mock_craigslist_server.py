@@ -0,0 +1,235 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from geo_index import GAZETTEER
+
+NEIGHBORHOODS = sorted(GAZETTEER)
+HOUSING_TYPES = ['apartment', 'house', 'condo', 'townhouse', 'duplex']
+
+
+class MockConfig:
+    """
+    Behaviour of the mock server. Latencies are in milliseconds, rates are
+    fractions of requests (0.05 = 5%).
+    """
+
+    def __init__(
+        self,
+        listings_per_search: int = 120,
+        page_latency_ms: float = 50,
+        latency_jitter_ms: float = 20,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        dead_rate: float = 0.0,
+        llm_latency_ms: float = 300,
+        seed: int = 0
+    ):
+        self.listings_per_search = listings_per_search
+        self.page_latency_ms = page_latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.dead_rate = dead_rate
+        self.llm_latency_ms = llm_latency_ms
+        self.seed = seed
+
+
+def render_search_page(base_url: str, count: int) -> str:
+    """
+    Search results page linking to `count` listing pages
+    """
+    items = '\n'.join(
+        f'<li class="cl-static-search-result"><a href="{base_url}/listing/{i}.html">Listing {i}</a></li>'
+        for i in range(count)
+    )
+    return f'<html><body><ol class="cl-static-search-results">\n{items}\n</ol></body></html>'
+
+
+def render_listing_page(listing_id: int, seed: int = 0) -> str:
+    """
+    Listing page with the same structure as a real Craigslist posting
+    """
+    rng = random.Random(seed * 1000003 + listing_id)
+    neighborhood = rng.choice(NEIGHBORHOODS)
+    lat, lon = GAZETTEER[neighborhood]
+    rooms = rng.randrange(1, 4)
+    price = rng.randrange(900, 4000)
+    month = rng.choice(['June', 'July', 'August', 'September'])
+    images = ''.join(f'<img src="https://images.example/{listing_id}_{n}.jpg">' for n in range(rng.randrange(0, 12)))
+    body = ' '.join([
+        f'Bright {rooms} bedroom {rng.choice(HOUSING_TYPES)} in {neighborhood.title()}.',
+        f'Available {month} {rng.randrange(1, 28)}.',
+        'Private bath and separate kitchen.' if rng.random() < 0.5 else 'Shared kitchen.',
+        'Hydro and internet included.' if rng.random() < 0.5 else 'Utilities extra.',
+        'Laundry in building, street parking.',
+        'Close to transit, shops and the park. ' * rng.randrange(1, 6),
+        'Show contact info. Call or text 604-555-0100.',
+    ])
+    return f"""<html><body>
+<h1><span class="postingtitletext">{rooms}BR {neighborhood.title()} <span class="price">${price:,}</span></span></h1>
+<div class="mapaddress">{neighborhood.title()}</div>
+<div id="map" data-latitude="{lat + rng.uniform(-0.005, 0.005):.6f}" data-longitude="{lon + rng.uniform(-0.005, 0.005):.6f}"></div>
+<div class="attrgroup"><span class="attr">{rooms}BR / 1Ba</span></div>
+<div class="attrgroup">
+<span class="attr">available {month.lower()} 1</span>
+<span class="attr">{rng.choice(HOUSING_TYPES)}</span>
+<span class="attr">laundry in bldg</span>
+<span class="attr">street parking</span>
+{'<span class="attr">furnished</span>' if rng.random() < 0.4 else ''}
+</div>
+<div id="thumbs">{images}</div>
+<section id="postingbody">{body}</section>
+</body></html>"""
+
+
+def stub_completion(request: dict) -> dict:
+    """
+    OpenAI-style chat completion that echoes the `details` key=value lines
+    of the enrichment prompt back as a JSON object
+    """
+    messages = request.get('messages', [])
+    content = messages[-1].get('content', '') if messages else ''
+    if isinstance(content, list):
+        content = ''.join(part.get('text', '') for part in content if isinstance(part, dict))
+
+    details = {}
+    section = content.split('description:')[0]
+    for line in section.splitlines():
+        if '=' in line:
+            key, _, value = line.partition('=')
+            try:
+                details[key.strip()] = json.loads(value)
+            except ValueError:
+                details[key.strip()] = value
+    reply = json.dumps(details)
+
+    prompt_chars = sum(len(json.dumps(message.get('content', ''))) for message in messages)
+    return {
+        'id': f'stub-{time.time_ns()}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'stub'),
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+        'usage': {
+            'prompt_tokens': prompt_chars // 4,
+            'completion_tokens': len(reply) // 4,
+            'total_tokens': prompt_chars // 4 + len(reply) // 4,
+        },
+    }
+
+
+def make_handler(config: MockConfig):
+    """
+    Request handler class bound to a MockConfig
+    """
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+
+    def roll() -> float:
+        with rng_lock:
+            return rng.random()
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str, content_type: str = 'text/html', headers: dict = None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _page_delay(self):
+            jitter = (roll() * 2 - 1) * config.latency_jitter_ms
+            time.sleep(max(0.0, config.page_latency_ms + jitter) / 1000)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            self._page_delay()
+
+            if path.startswith('/search/'):
+                host = self.headers.get('Host', f'127.0.0.1:{self.server.server_port}')
+                self._send(200, render_search_page(f'http://{host}', config.listings_per_search))
+                return
+
+            if path.startswith('/listing/') and path.endswith('.html'):
+                draw = roll()
+                if draw < config.throttle_rate:
+                    self._send(429, 'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+                elif draw < config.throttle_rate + config.error_rate:
+                    self._send(503, 'Service Unavailable', 'text/plain')
+                elif draw < config.throttle_rate + config.error_rate + config.dead_rate:
+                    self._send(404, 'This posting has been deleted', 'text/plain')
+                else:
+                    listing_id = int(path[len('/listing/'):-len('.html')])
+                    self._send(200, render_listing_page(listing_id, config.seed))
+                return
+
+            self._send(404, 'Not Found', 'text/plain')
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+
+            if path.endswith('/chat/completions'):
+                time.sleep(config.llm_latency_ms / 1000)
+                self._send(200, json.dumps(stub_completion(request)), 'application/json')
+                return
+
+            self._send(404, json.dumps({'error': 'not found'}), 'application/json')
+
+    return MockHandler
+
+
+def start_server(config: MockConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a background thread; port 0 picks a free port
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Craigslist + LLM server for load tests")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--listings', type=int, default=120, help="Listings per search page")
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--dead-rate', type=float, default=0.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=300)
+    args = parser.parse_args()
+
+    server = start_server(MockConfig(
+        listings_per_search=args.listings,
+        page_latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        dead_rate=args.dead_rate,
+        llm_latency_ms=args.llm_latency_ms,
+    ), port=args.port)
+    base = f'http://127.0.0.1:{server.server_port}'
+    print(f"Mock Craigslist at {base} (CRAIGSLIST_BASE_URL={base})")
+    print(f"Stub LLM at {base}/v1 (LISTING_MODEL_ID=openai/stub LISTING_MODEL_API_BASE={base}/v1,")
+    print(f"  LITELLM_MODEL_NAME=openai/stub LITELLM_API_BASE={base}/v1 for ChatLiteLLM)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,141 @@
+import argparse
+import cProfile
+import glob
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional
+
+# imported here, not in replay_listing_pages, so loading the scraping and LLM
+# libraries is not part of the profile
+from csv_extraction import parse_listing_html, save_listings
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of all threads every `interval` seconds and
+    counts them as collapsed stacks ('outer;inner;leaf count'), the input
+    format of flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_collapsed(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def profile_run(func: Callable, *args, output_prefix: str = 'profile', top: int = 25, **kwargs):
+    """
+    Run func(*args, **kwargs) under cProfile and the sampling profiler and write:
+
+    - <output_prefix>.pstats: cProfile data (snakeviz, pstats)
+    - <output_prefix>.collapsed: collapsed stacks for flamegraphs
+    - <output_prefix>_top.txt: top `top` functions by cumulative time
+
+    Returns whatever func returns.
+    """
+    sampler = SamplingProfiler()
+    profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        sampler.stop()
+    elapsed = time.perf_counter() - start
+
+    profiler.dump_stats(f'{output_prefix}.pstats')
+    sampler.write_collapsed(f'{output_prefix}.collapsed')
+
+    report = io.StringIO()
+    report.write(f'Wall time: {elapsed:.2f} s\n\n')
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(top)
+    with open(f'{output_prefix}_top.txt', 'w') as f:
+        f.write(report.getvalue())
+
+    print(report.getvalue())
+    print(f"Profile written to {output_prefix}.pstats, {output_prefix}.collapsed and {output_prefix}_top.txt")
+    return result
+
+
+def replay_listing_pages(html_paths, workdir: Optional[str] = None, batch_size: int = 1) -> int:
+    """
+    Run saved listing pages through the extraction and storage hot path
+    (parse_listing_html + save_listings) without network or LLM calls.
+    Listings are stored `batch_size` at a time; 1 matches one write per
+    listing, larger values match group commits. Output goes to `workdir`
+    (a temp dir by default). Returns the number stored.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='craigslist_replay_')
+    previous_dir = os.getcwd()
+    paths = [os.path.abspath(path) for path in html_paths]
+    os.chdir(workdir)
+    try:
+        stored = 0
+        batch = []
+        for path in paths:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                details = parse_listing_html(f.read(), f'file://{path}')
+            if details:
+                batch.append(details)
+            if len(batch) >= batch_size:
+                stored += save_listings(batch)
+                batch = []
+        return stored + save_listings(batch)
+    finally:
+        os.chdir(previous_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the listing extraction hot path on saved pages")
+    parser.add_argument('--replay', required=True, help="Glob of saved listing HTML files, e.g. 'pages/*.html'")
+    parser.add_argument('--out', default='profile', help="Output file prefix")
+    parser.add_argument('--top', type=int, default=25, help="Number of functions in the report")
+    parser.add_argument('--batch-size', type=int, default=1, help="Listings per storage write")
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(args.replay))
+    if not pages:
+        sys.exit(f"No files match {args.replay}")
+    profile_run(replay_listing_pages, pages, batch_size=args.batch_size, output_prefix=args.out, top=args.top)
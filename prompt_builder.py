@@ -0,0 +1,223 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+# Static instructions, the same for every listing. At about 300 tokens they are
+# below the providers' minimum cacheable prefix (1024 tokens for Anthropic), so
+# they are not marked for prompt caching.
+SYSTEM_PREAMBLE = """You verify apartment listings scraped from Craigslist.
+
+You get the scraped `details` as key=value lines and the relevant sentences of the listing `description`.
+For each key:
+- If the value is null, infer it from the description if possible.
+- If the value is set, keep it when the description agrees or says nothing, replace it when the description contradicts it.
+
+Field definitions:
+- price: Monthly rent (CAD), e.g., 1900
+- rooms: Number of bedrooms (integer)
+- separate_bath: True if the unit has a private bathroom, False otherwise
+- separate_kitchen: True if there is a private kitchen, False otherwise
+- neighborhood: Area or location mentioned, e.g., Kitsilano, Mount Pleasant (If exact address is given then don't update )
+- start_date: Move-in date if mentioned (YYYY-MM-DD)
+- housing_type: e.g., apartment, studio, basement
+- rent_period: e.g., monthly, yearly, sublet, 6months, 4 months .., lease
+- furnished: True if furnished
+- amenities: list, e.g., ["laundry"]
+- parking: e.g., included, street, none
+- gym: True if gym is available
+- dishwasher: True if unit includes a dishwasher
+- utilities: e.g. Included, excluded: If yes, which ones: hydro, heat, hot water, internet, list all that are included
+
+Reply with a single JSON object containing only the keys you were given, and nothing else."""
+
+# Fields the model checks, and the words that make a sentence relevant to them.
+# Each word is a regular expression matched as a whole word, so 'ave' does not
+# match "have" and 'br' does not match "bright" (digits may touch it: "2br").
+FIELD_KEYWORDS: Dict[str, List[str]] = {
+    'price': [r'\$', 'rent', 'price', 'month(s|ly)?', '/mo'],
+    'rooms': ['beds?', 'bedrooms?', 'rooms?', 'br', 'bdrm', 'studio'],
+    'separate_bath': ['bath(room)?s?', 'washrooms?', 'showers?', 'ensuite'],
+    'separate_kitchen': ['kitchens?', 'cook(ing)?', 'shared'],
+    'neighborhood': ['located', 'location', 'near', 'neighbou?rhood', 'area', 'street', 'ave', 'avenue', 'skytrain', 'station'],
+    'start_date': ['available', 'availability', 'move[ -]?in', 'starting', 'until'],
+    'housing_type': ['apartment', 'house', 'condo', 'basement', 'suite', 'townhouse', 'studio'],
+    'rent_period': ['month(s|ly)?', 'week(s|ly)?', 'lease', 'sublet', 'term', 'year(s|ly)?'],
+    'furnished': ['(un)?furnished', 'furniture'],
+    'amenities': ['laundry', 'washer', 'dryer', 'balcony', 'pool'],
+    'parking': ['parking', 'garage', 'stalls?'],
+    'gym': ['gym', 'fitness'],
+    'dishwasher': ['dishwasher'],
+    'utilities': ['utility', 'utilities', 'hydro', 'heat(ing)?', 'hot water', 'internet', 'wi-?fi', 'included'],
+}
+
+_KEYWORDS = re.compile(
+    r'(?<![a-z])(?:' + '|'.join(keyword for words in FIELD_KEYWORDS.values() for keyword in words) + r')(?![a-z])',
+    re.IGNORECASE
+)
+
+# Lines that carry no information about the unit
+_BOILERPLATE = re.compile(
+    r'(show contact info|do not contact|unsolicited|qr code|call or text|text me|email me|\b\d{3}[\s.-]\d{3}[\s.-]\d{4}\b|@)',
+    re.IGNORECASE
+)
+_NON_TEXT = re.compile(r'[^\w\s$.,:;/()&%+#\'"-]')
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def compact_description(description: Optional[str], max_chars: int = 1200) -> str:
+    """
+    Reduce a listing description to the sentences that mention one of the
+    checked fields: emoji and contact boilerplate are dropped, repeated
+    sentences are kept once, and the result is cut at `max_chars`.
+    """
+    if not description:
+        return ''
+
+    seen = set()
+    kept = []
+    length = 0
+    for sentence in _SENTENCE_SPLIT.split(description):
+        sentence = re.sub(r'\s+', ' ', _NON_TEXT.sub('', sentence)).strip()
+        key = sentence.lower()
+        if len(sentence) < 3 or key in seen or _BOILERPLATE.search(sentence):
+            continue
+        seen.add(key)
+        if not _KEYWORDS.search(sentence):
+            continue
+        if length + len(sentence) > max_chars:
+            break
+        kept.append(sentence)
+        length += len(sentence) + 1
+    return '\n'.join(kept)
+
+
+def serialize_details(details: Dict[str, any]) -> str:
+    """
+    Compact key=value serialization of the fields the model checks
+    """
+    return '\n'.join(f'{field}={json.dumps(details.get(field), default=str)}' for field in FIELD_KEYWORDS)
+
+
+def build_enrichment_messages(details: Dict[str, any], max_description_chars: int = 1200) -> List[Dict[str, any]]:
+    """
+    Chat messages for enriching one listing: the static system preamble
+    followed by the listing-specific part
+    """
+    user_prompt = (
+        'details:\n' + serialize_details(details)
+        + '\n\ndescription:\n' + compact_description(details.get('description'), max_description_chars)
+    )
+    return [
+        {
+            'role': 'system',
+            'content': [{'type': 'text', 'text': SYSTEM_PREAMBLE}],
+        },
+        {
+            'role': 'user',
+            'content': [{'type': 'text', 'text': user_prompt}],
+        },
+    ]
+
+
+def parse_enrichment_reply(reply: str, details: Dict[str, any]) -> Dict[str, any]:
+    """
+    Merge the JSON object in the model's reply into `details`.
+    Only checked fields are taken from the reply; everything else is kept.
+    """
+    match = re.search(r'\{.*\}', reply or '', re.DOTALL)
+    if not match:
+        raise ValueError(f"No JSON object in model reply: {reply!r}")
+    updates = json.loads(match.group(0))
+    merged = dict(details)
+    merged.update({field: value for field, value in updates.items() if field in FIELD_KEYWORDS})
+    return merged
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about 4 characters per token) for providers that
+    don't report usage
+    """
+    return max(1, len(text) // 4)
+
+
+def estimate_call_tokens(messages: List[Dict[str, any]], details: Dict[str, any]) -> int:
+    """
+    Tokens to reserve before an enrichment call: the prompt plus a reply
+    about as long as the details it sends back as JSON
+    """
+    prompt_text = ''.join(part['text'] for message in messages for part in message['content'])
+    return estimate_tokens(prompt_text) + estimate_tokens(serialize_details(details))
+
+
+class TokenBudgetExceeded(Exception):
+    """
+    The run has used up its token budget
+    """
+
+
+class TokenBudget:
+    """
+    Thread-safe per-run token accounting with an optional limit.
+
+    Calls reserve their estimated tokens before they start, so concurrent
+    calls can't all pass the limit check and overshoot it together.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None):
+        self.max_tokens = max_tokens
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.reserved_tokens = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def reserve(self, tokens: int) -> int:
+        """
+        Set aside `tokens` for a call about to be made and return them; pass
+        them to record() or release() once the call is over. Raises
+        TokenBudgetExceeded if the tokens used plus those reserved by calls
+        still running would pass the limit.
+        """
+        with self._lock:
+            committed = self.total_tokens + self.reserved_tokens
+            if self.max_tokens is not None and committed + tokens > self.max_tokens:
+                raise TokenBudgetExceeded(
+                    f"Token budget of {self.max_tokens} used up ({committed} tokens used or reserved)"
+                )
+            self.reserved_tokens += tokens
+        return tokens
+
+    def release(self, reserved: int):
+        """
+        Give back a reservation whose call did not happen
+        """
+        with self._lock:
+            self.reserved_tokens -= reserved
+
+    def record(self, input_tokens: int, output_tokens: int, reserved: int = 0):
+        """
+        Account a finished call, replacing its reservation with the actual usage
+        """
+        with self._lock:
+            self.reserved_tokens -= reserved
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.calls += 1
+
+    def summary(self) -> str:
+        average = self.total_tokens / self.calls if self.calls else 0
+        return (
+            f"LLM calls: {self.calls}, input tokens: {self.input_tokens}, "
+            f"output tokens: {self.output_tokens}, avg per listing: {average:.0f}"
+        )
+
+
+# Budget for this run, set LISTING_TOKEN_BUDGET to cap it
+token_budget = TokenBudget(int(os.getenv('LISTING_TOKEN_BUDGET', '0')) or None)
@@ -0,0 +1,153 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+from typing import Iterable
+
+from csv_extraction import (
+    CSV_PREFIX,
+    JSON_DATABASE_PATH,
+    enrich_listing_details,
+    extract_listing_details,
+    load_merged_database,
+    save_listings,
+)
+from work_queue import WORK_QUEUE_PATH, WorkQueue
+
+
+def shard_json_path(shard: int, json_path: str = JSON_DATABASE_PATH) -> str:
+    """
+    JSON partition for a shard, e.g. 'listings_database.shard3.json'
+    """
+    root, ext = os.path.splitext(json_path)
+    return f'{root}.shard{shard}{ext}'
+
+
+def shard_csv_prefix(shard: int, csv_prefix: str = CSV_PREFIX) -> str:
+    """
+    CSV prefix for a shard, e.g. 'craigslist_listings_shard3'
+    """
+    return f'{csv_prefix}_shard{shard}'
+
+
+def run_shard_worker(
+    shard: int,
+    db_path: str = WORK_QUEUE_PATH,
+    batch_size: int = 10,
+    lease_seconds: float = 300,
+    poll_interval: float = 2.0,
+    exit_when_empty: bool = True,
+    wal: bool = False
+) -> int:
+    """
+    Process the URLs of one shard and write them to the shard's own
+    JSON/CSV partition. Returns the number of listings stored.
+
+    Args:
+        shard: Shard number to work on
+        db_path: SQLite work queue shared by the coordinator and the workers
+        batch_size: URLs leased (and stored) per round
+        lease_seconds: How long a batch may take before other workers may retry it
+        poll_interval: Seconds to wait when the shard has no claimable work
+        exit_when_empty: Stop once the shard has no pending URLs left
+        wal: Use WAL mode; only when every worker runs on this host
+    """
+    queue = WorkQueue(db_path, wal=wal)
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    json_path = shard_json_path(shard)
+    csv_prefix = shard_csv_prefix(shard)
+    stored = 0
+
+    while True:
+        urls = queue.claim(shard, owner, limit=batch_size, lease_seconds=lease_seconds)
+        if not urls:
+            if exit_when_empty and queue.pending_count(shard) == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        listings, processed, failed = [], [], []
+        for url in urls:
+            try:
+                details = enrich_listing_details(extract_listing_details(url))
+            except Exception as e:
+                print(f"Error processing listing {url}: {e}")
+                details = None
+            if details:
+                listings.append(details)
+                processed.append(url)
+            else:
+                failed.append(url)
+
+        try:
+            saved = save_listings(listings, json_path=json_path, csv_prefix=csv_prefix)
+        except Exception as e:
+            print(f"Error storing shard {shard} batch: {e}")
+            saved = 0
+        stored += saved
+        # a failed write stores nothing (save_listings logs it and returns 0),
+        # so the batch goes back to the queue instead of being marked done
+        if saved == len(listings):
+            queue.complete(processed, owner)
+        else:
+            queue.release(processed, owner)
+        queue.release(failed, owner)
+
+    print(f"Shard {shard} stored {stored} listing(s)")
+    return stored
+
+
+def enqueue_new_urls(urls: Iterable[str], num_shards: int, db_path: str = WORK_QUEUE_PATH, wal: bool = False) -> int:
+    """
+    Queue the URLs that are not in the database (or any partition) yet
+    """
+    known_links = load_merged_database()
+    added = WorkQueue(db_path, wal=wal).enqueue((url for url in urls if url not in known_links), num_shards)
+    print(f"Queued {added} new listing(s) across {num_shards} shard(s)")
+    return added
+
+
+def run_coordinator(urls: Iterable[str], num_shards: int = 4, db_path: str = WORK_QUEUE_PATH) -> int:
+    """
+    Queue new listing URLs and process them with one worker process per shard.
+    Everything runs on this host, so the queue uses WAL mode.
+    """
+    added = enqueue_new_urls(urls, num_shards, db_path, wal=True)
+
+    workers = [
+        multiprocessing.Process(target=run_shard_worker, args=(shard, db_path), kwargs={'wal': True})
+        for shard in range(num_shards)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return added
+
+
+if __name__ == "__main__":
+    # Single box:   python shard_coordinator.py run --shards 4 --urls urls.txt
+    # Several nodes sharing the queue file (rollback journal, the file system
+    # must support POSIX locks, e.g. NFSv4):
+    #               python shard_coordinator.py enqueue --shards 4 --urls urls.txt
+    #               python shard_coordinator.py worker --shard 2   (one per node/shard)
+    parser = argparse.ArgumentParser(description="Sharded Craigslist crawl coordinator")
+    parser.add_argument('command', choices=['enqueue', 'worker', 'run'])
+    parser.add_argument('--db', default=WORK_QUEUE_PATH, help="SQLite work queue path")
+    parser.add_argument('--shards', type=int, default=4, help="Total number of shards")
+    parser.add_argument('--shard', type=int, help="Shard to work on (worker command)")
+    parser.add_argument('--urls', help="File with one listing URL per line")
+    args = parser.parse_args()
+
+    urls = []
+    if args.urls:
+        with open(args.urls) as f:
+            urls = [line.strip() for line in f if line.strip()]
+
+    if args.command == 'enqueue':
+        enqueue_new_urls(urls, args.shards, db_path=args.db)
+    elif args.command == 'worker':
+        run_shard_worker(args.shard, db_path=args.db, exit_when_empty=False)
+    else:
+        run_coordinator(urls, num_shards=args.shards, db_path=args.db)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from change_history import ChangeHistory, diff_entries
+
+
+def days_ago(days):
+    return (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+
+
+def test_diff_entries_skips_untracked_fields():
+    old = {'price': 1000, 'rooms': 2, 'date_scraped': '2024-06-01', 'description': 'a'}
+    new = {'price': 900, 'rooms': 2, 'date_scraped': '2024-06-02', 'description': 'b'}
+    assert diff_entries(old, new) == {'price': (1000, 900)}
+
+
+def test_history_is_oldest_first(tmp_path):
+    history = ChangeHistory(str(tmp_path / 'history.db'))
+    history.record({'a': {'price': (1000, 940)}}, changed_at=days_ago(2))
+    history.record({'a': {'price': (940, 880), 'rooms': (1, 2)}}, changed_at=days_ago(1))
+    assert [(c['field'], c['old'], c['new']) for c in history.history('a')] == [
+        ('price', 1000, 940), ('price', 940, 880), ('rooms', 1, 2)
+    ]
+
+
+def test_price_drops_add_up_within_window(tmp_path):
+    history = ChangeHistory(str(tmp_path / 'history.db'))
+    history.record({'a': {'price': (1000, 940)}}, changed_at=days_ago(5))
+    history.record({'a': {'price': (940, 880)}}, changed_at=days_ago(2))
+
+    drops = history.price_drops(min_drop_pct=10, days=7)
+    assert [(d['link'], d['old'], d['new'], d['drop_pct']) for d in drops] == [('a', 1000, 880, 12.0)]
+
+
+def test_price_drops_ignore_changes_outside_window(tmp_path):
+    history = ChangeHistory(str(tmp_path / 'history.db'))
+    history.record({'a': {'price': (2000, 1000)}}, changed_at=days_ago(30))
+    history.record({'a': {'price': (1000, 950)}}, changed_at=days_ago(1))
+    assert history.price_drops(min_drop_pct=10, days=7) == []
+
+
+def test_price_drops_net_of_increases_biggest_first(tmp_path):
+    history = ChangeHistory(str(tmp_path / 'history.db'))
+    # dropped then went back up: a net 5% drop
+    history.record({'a': {'price': (1000, 800)}}, changed_at=days_ago(3))
+    history.record({'a': {'price': (800, 950)}}, changed_at=days_ago(1))
+    history.record({'b': {'price': (2000, 1500)}}, changed_at=days_ago(2))
+    history.record({'c': {'price': (1000, 850)}}, changed_at=days_ago(2))
+
+    assert [d['link'] for d in history.price_drops(min_drop_pct=10, days=7)] == ['b', 'c']
+
+
+def test_numeric_fields_compare_as_integers():
+    assert diff_entries({'price': 1900, 'rooms': 2}, {'price': '1900', 'rooms': '2'}) == {}
+    assert diff_entries({'price': 2000}, {'price': '$1,500'}) == {'price': (2000, 1500)}
+
+
+def test_price_drop_reported_as_strings(tmp_path):
+    history = ChangeHistory(str(tmp_path / 'history.db'))
+    history.record({'a': {'price': ('2000', '1500')}}, changed_at=days_ago(1))
+    assert [(d['old'], d['new'], d['drop_pct']) for d in history.price_drops()] == [(2000, 1500, 25.0)]
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from geo_index import GAZETTEER, SpatialIndex, geocode, haversine_km
+from listing_record import Listing, ListingTable
+
+
+def test_neighbourhood_after_city_name():
+    assert geocode('Vancouver, Kitsilano') == GAZETTEER['kitsilano']
+
+
+def test_alias_and_exact_name():
+    assert geocode('Kits') == GAZETTEER['kitsilano']
+    assert geocode('Mt. Pleasant (Main St)') == GAZETTEER['mount pleasant']
+
+
+def test_longer_name_wins_over_city():
+    assert geocode('North Vancouver') == GAZETTEER['north vancouver']
+    assert geocode('East Vancouver') == GAZETTEER['east vancouver']
+
+
+def test_city_alone_has_no_coordinates():
+    assert geocode('Vancouver') is None
+    assert geocode('1234 W 4th Ave, Vancouver') is None
+    assert geocode('') is None
+
+
+def test_street_names_have_no_coordinates():
+    assert geocode('1234 Main St, Vancouver') is None
+    assert geocode('Cambie and 12th') is None
+
+
+def random_points(count=500, seed=1):
+    rng = random.Random(seed)
+    return {f'https://example.org/{i}.html': (rng.uniform(49.15, 49.35), rng.uniform(-123.25, -122.85)) for i in range(count)}
+
+
+@pytest.mark.parametrize('radius_km', [0.5, 2, 7.5])
+def test_radius_matches_brute_force(radius_km):
+    points = random_points()
+    index = SpatialIndex()
+    for link, (lat, lon) in points.items():
+        index.add(link, lat, lon)
+
+    lat, lon = GAZETTEER['kitsilano']
+    expected = sorted(
+        (link for link, point in points.items() if haversine_km(lat, lon, *point) <= radius_km),
+        key=lambda link: haversine_km(lat, lon, *points[link])
+    )
+    results = index.radius(lat, lon, radius_km)
+    assert [link for link, _ in results] == expected
+    assert all(abs(distance - haversine_km(lat, lon, *points[link])) < 1e-9 for link, distance in results)
+
+
+def test_bbox_matches_brute_force():
+    points = random_points()
+    index = SpatialIndex(cell_deg=0.02)
+    for link, (lat, lon) in points.items():
+        index.add(link, lat, lon)
+
+    box = (49.22, -123.17, 49.29, -123.05)
+    expected = {link for link, (lat, lon) in points.items() if box[0] <= lat <= box[2] and box[1] <= lon <= box[3]}
+    assert set(index.bbox(*box)) == expected
+
+
+def test_add_move_remove():
+    index = SpatialIndex()
+    index.add('a', *GAZETTEER['kitsilano'])
+    index.add('a', *GAZETTEER['burnaby'])
+    assert len(index) == 1
+    assert index.near('Kitsilano', 1) == []
+    assert [link for link, _ in index.near('Burnaby', 1)] == ['a']
+
+    index.remove('a')
+    index.remove('missing')
+    assert len(index) == 0
+    assert index.near('Burnaby', 1) == []
+
+
+def test_haversine_km():
+    assert haversine_km(49.0, -123.0, 49.0, -123.0) == 0
+    # one degree of latitude is about 111 km
+    assert abs(haversine_km(49.0, -123.0, 50.0, -123.0) - 111.2) < 0.1
+
+
+def test_from_table_skips_listings_without_coordinates():
+    table = ListingTable()
+    lat, lon = GAZETTEER['kitsilano']
+    table.append(Listing.from_dict({'link': 'a', 'latitude': lat, 'longitude': lon}))
+    table.append(Listing.from_dict({'link': 'b'}))
+    index = SpatialIndex.from_table(table)
+    assert len(index) == 1
+    assert [link for link, _ in index.radius(lat, lon, 0.1)] == ['a']
@@ -0,0 +1,154 @@
+import json
+import time
+
+import pytest
+import requests
+
+import http_client
+from http_client import CircuitBreaker, CircuitOpenError, DeadUrlError, HttpClient, NegativeCache
+
+URL = 'https://vancouver.craigslist.org/van/apa/d/1.html'
+
+
+def make_response(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.url = URL
+    response.headers.update(headers or {})
+    response._content = b''
+    response._content_consumed = True
+    return response
+
+
+class FakeSession:
+    """
+    Returns the queued responses in order; exceptions in the queue are raised
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(http_client.time, 'sleep', slept.append)
+    return slept
+
+
+def make_client(tmp_path, session, **kwargs):
+    client = HttpClient(negative_cache=NegativeCache(str(tmp_path / 'negative_cache.json')), **kwargs)
+    client._local.session = session
+    return client
+
+
+def test_breaker_opens_half_opens_and_resets():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure('a')
+    assert breaker.allow('a')
+    breaker.record_failure('a')
+    assert not breaker.allow('a')
+    assert breaker.allow('b')
+
+    time.sleep(0.06)
+    # half-open: one trial request, the next caller still waits
+    assert breaker.allow('a')
+    assert not breaker.allow('a')
+
+    breaker.record_success('a')
+    assert breaker.allow('a')
+
+
+def test_breaker_reopens_when_trial_fails():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure('a')
+    time.sleep(0.06)
+    assert breaker.allow('a')
+    breaker.record_failure('a')
+    assert not breaker.allow('a')
+
+
+def test_negative_cache_expires(tmp_path):
+    cache = NegativeCache(str(tmp_path / 'cache.json'), ttl=0.05)
+    cache.add(URL)
+    assert cache.contains(URL)
+    time.sleep(0.06)
+    assert not cache.contains(URL)
+
+
+def test_negative_cache_persists_and_merges_other_processes(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    first = NegativeCache(path)
+    second = NegativeCache(path)
+    first.add('https://example.org/a')
+    second.add('https://example.org/b')
+
+    with open(path) as f:
+        assert set(json.load(f)) == {'https://example.org/a', 'https://example.org/b'}
+    assert NegativeCache(path).contains('https://example.org/a')
+
+
+def test_backoff_caps_retry_after_and_jitters(tmp_path):
+    client = make_client(tmp_path, FakeSession(), backoff_base=1, backoff_max=10)
+    assert client._backoff(0, '3') == 3
+    assert client._backoff(0, '120') == 10
+    assert all(0 <= client._backoff(2, 'Wed, 21 Oct 2015 07:28:00 GMT') <= 4 for _ in range(50))
+    assert all(0 <= client._backoff(10) <= 10 for _ in range(50))
+
+
+def test_get_retries_transient_errors(tmp_path, sleeps):
+    session = FakeSession(
+        requests.exceptions.ConnectionError('reset'),
+        make_response(429, {'Retry-After': '2'}),
+        make_response(200),
+    )
+    client = make_client(tmp_path, session)
+    assert client.get(URL).status_code == 200
+    assert session.calls == 3
+    assert len(sleeps) == 2 and sleeps[1] == 2
+
+
+def test_get_raises_after_retries(tmp_path, sleeps):
+    session = FakeSession(*[make_response(503) for _ in range(3)])
+    client = make_client(tmp_path, session, max_retries=2)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get(URL)
+    assert session.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_get_does_not_retry_client_errors(tmp_path, sleeps):
+    session = FakeSession(make_response(403))
+    client = make_client(tmp_path, session)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get(URL)
+    assert session.calls == 1
+    assert sleeps == []
+
+
+def test_dead_url_is_cached(tmp_path, sleeps):
+    session = FakeSession(make_response(404))
+    client = make_client(tmp_path, session)
+    with pytest.raises(DeadUrlError):
+        client.get(URL)
+    # the second request never reaches the network
+    with pytest.raises(DeadUrlError):
+        client.get(URL)
+    assert session.calls == 1
+    assert client.breaker.allow('vancouver.craigslist.org')
+
+
+def test_open_circuit_short_circuits(tmp_path, sleeps):
+    session = FakeSession(*[requests.exceptions.Timeout('slow') for _ in range(2)])
+    client = make_client(tmp_path, session, max_retries=3, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+    assert session.calls == 2
@@ -0,0 +1,135 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from listing_pipeline import PipelineStages, StageStats, run_pipeline
+
+
+def urls(count):
+    return [f'https://example.org/{i}.html' for i in range(count)]
+
+
+def make_stages(save=None, known_links=(), fetch=None, parse=None, enrich=None):
+    saved = []
+
+    def default_save(batch):
+        saved.append(list(batch))
+        return len(batch)
+
+    stages = PipelineStages(
+        fetch=fetch or (lambda url: f'<html>{url}</html>'),
+        parse=parse or (lambda html, url: {'link': url}),
+        enrich=enrich or (lambda details: dict(details, enriched=True)),
+        save=save or default_save,
+        known_links=lambda: known_links
+    )
+    return stages, saved
+
+
+def run(stages, links, timeout=10, **kwargs):
+    """
+    Run the pipeline on a thread and fail instead of hanging the test suite
+    """
+    result = {}
+
+    def target():
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                result['stored'] = run_pipeline(
+                    links, stages=stages, parse_executor=pool,
+                    **{'fetch_workers': 2, 'parse_workers': 2, 'enrich_workers': 2, **kwargs}
+                )
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not shut down"
+    return result
+
+
+def test_stores_every_new_listing_in_batches():
+    stages, saved = make_stages(known_links={'https://example.org/0.html'})
+    result = run(stages, urls(50), batch_size=8, queue_size=4)
+    assert result == {'stored': 49}
+    links = [details['link'] for batch in saved for details in batch]
+    assert sorted(links) == sorted(urls(50)[1:])
+    assert all(details['enriched'] for batch in saved for details in batch)
+    assert max(len(batch) for batch in saved) <= 8
+
+
+def test_failing_items_do_not_stall_the_pipeline():
+    def fetch(url):
+        if url.endswith('/1.html'):
+            raise OSError('connection reset')
+        return url
+
+    def parse(html, url):
+        if url.endswith('/2.html'):
+            raise ValueError('bad html')
+        return None if url.endswith('/3.html') else {'link': url}
+
+    def enrich(details):
+        if details['link'].endswith('/4.html'):
+            raise RuntimeError('model error')
+        return None if details['link'].endswith('/5.html') else details
+
+    stages, saved = make_stages(fetch=fetch, parse=parse, enrich=enrich)
+    assert run(stages, urls(20), queue_size=1) == {'stored': 15}
+
+
+def test_failing_saves_are_logged_and_the_run_finishes():
+    def save(batch):
+        raise OSError('disk full')
+
+    stages, _ = make_stages(save=save)
+    assert run(stages, urls(100), batch_size=2, queue_size=1) == {'stored': 0}
+
+
+def test_writer_crash_fails_the_run():
+    class BrokenStats(StageStats):
+        def add(self, stage, seconds):
+            if stage == 'store':
+                raise RuntimeError('writer crashed')
+            super().add(stage, seconds)
+
+    stages, _ = make_stages()
+    result = run(stages, urls(100), batch_size=1, queue_size=1, stats=BrokenStats())
+    assert isinstance(result.get('error'), RuntimeError)
+
+
+def test_slow_writer_applies_backpressure():
+    fetched = []
+    in_flight = []
+
+    def fetch(url):
+        fetched.append(url)
+        return url
+
+    def save(batch):
+        if not in_flight:
+            time.sleep(0.3)
+            in_flight.append(len(fetched))
+        return len(batch)
+
+    stages, _ = make_stages(fetch=fetch, save=save)
+    result = run(stages, urls(200), batch_size=1, queue_size=2)
+    assert result == {'stored': 200}
+    # 4 queues of 2, one item held by each of the 6 workers, one in the writer
+    assert in_flight[0] <= 4 * 2 + 6 + 1
+
+
+def test_partial_batch_is_flushed_after_interval():
+    stages, saved = make_stages()
+    result = run(stages, urls(3), batch_size=100, flush_interval=0.05, rate=5)
+    assert result == {'stored': 3}
+    assert [len(batch) for batch in saved] == [1, 1, 1]
+
+
+@pytest.mark.parametrize('count', [0, 1])
+def test_empty_and_single_url(count):
+    stages, _ = make_stages()
+    assert run(stages, urls(count)) == {'stored': count}
@@ -0,0 +1,42 @@
+import math
+
+from listing_record import Listing, ListingTable, _to_int
+
+
+def test_to_int():
+    assert _to_int(1900) == 1900
+    assert _to_int(1900.0) == 1900
+    assert _to_int('$1,900') == 1900
+    assert _to_int('1,900.00') == 1900
+    assert _to_int('$1900-$2100') == 1900
+    assert _to_int('2 bedrooms') == 2
+    assert _to_int('call for price') is None
+    assert _to_int(math.nan) is None
+    assert _to_int(True) is None
+
+
+def test_table_reads_formatted_price():
+    table = ListingTable()
+    table.append(Listing.from_dict({'link': 'https://example.org/1.html', 'price': '$2,450.00', 'rooms': '2'}))
+    assert table.values('price') == [2450]
+    assert table.values('rooms') == [2]
+
+
+def test_amenities_are_never_split_into_characters():
+    assert Listing.from_dict({'link': 'x', 'amenities': 'laundry, balcony'}).amenities == ['laundry, balcony']
+    assert Listing.from_dict({'link': 'x', 'amenities': ('laundry', 'pool')}).amenities == ['laundry', 'pool']
+    assert Listing.from_dict({'link': 'x', 'amenities': None}).amenities == []
+    assert Listing.from_dict({'link': 'x'}).to_entry()['amenities'] == []
+
+
+def test_extend_by_partition_matches_merged_database():
+    main = {'a': {'price': 1000}, 'b': {'price': 2000}}
+    shard = {'b': {'price': 1800}, 'c': {'price': 3000}}
+
+    table = ListingTable()
+    table.extend(main)
+    table.extend(shard)
+
+    merged = ListingTable.from_database({**main, **shard})
+    assert list(table.links) == list(merged.links) == ['a', 'b', 'c']
+    assert table.values('price') == merged.values('price') == [1000, 1800, 3000]
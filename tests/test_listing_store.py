@@ -0,0 +1,119 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from listing_store import GroupCommitWriter, atomic_write_json, store_lock
+
+
+def locked_commit(path):
+    """
+    Commit function doing the same locked read-modify-write as save_listings
+    """
+    def commit(batch):
+        with store_lock(path):
+            database = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    database = json.load(f)
+            for details in batch:
+                database[details['link']] = details
+            atomic_write_json(path, database)
+        return len(batch)
+    return commit
+
+
+def write_listings(path, worker, count):
+    writer = GroupCommitWriter(locked_commit(path), max_records=7, max_delay_ms=5)
+    for i in range(count):
+        writer.add({'link': f'https://example.org/{worker}/{i}.html', 'worker': worker})
+        if i % 10 == 0:
+            # let some groups go out on the timer instead of the size limit
+            time.sleep(0.01)
+    writer.flush()
+
+
+def test_group_commits_from_several_processes_are_all_kept(tmp_path):
+    path = str(tmp_path / 'listings_database.json')
+    workers = [multiprocessing.Process(target=write_listings, args=(path, worker, 50)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    with open(path) as f:
+        database = json.load(f)
+    assert len(database) == 4 * 50
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_group_is_committed_when_full_or_late(tmp_path):
+    batches = []
+    writer = GroupCommitWriter(lambda batch: batches.append(batch) or len(batch), max_records=3, max_delay_ms=20)
+    for i in range(4):
+        writer.add({'link': str(i)})
+    assert [len(batch) for batch in batches] == [3]
+    assert writer.pending_links() == {'3'}
+
+    time.sleep(0.2)
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert writer.committed == 4
+    assert writer.flush() == 0
+
+
+def test_store_lock_is_reentrant(tmp_path):
+    path = str(tmp_path / 'listings_database.json')
+    with store_lock(path):
+        with store_lock(path):
+            atomic_write_json(path, {'a': 1})
+    with open(path) as f:
+        assert json.load(f) == {'a': 1}
+
+
+def test_failed_commit_keeps_the_batch(tmp_path):
+    attempts = []
+
+    def commit(batch):
+        attempts.append([details['link'] for details in batch])
+        if len(attempts) == 1:
+            raise OSError('disk full')
+        return len(batch)
+
+    writer = GroupCommitWriter(commit, max_records=2, max_delay_ms=10000)
+    writer.add({'link': 'a'})
+    writer.add({'link': 'b'})
+    assert writer.pending_links() == {'a', 'b'}
+    assert writer.committed == 0
+
+    writer.add({'link': 'c'})
+    assert attempts == [['a', 'b'], ['a', 'b', 'c']]
+    assert writer.committed == 3
+    assert writer.pending_links() == set()
+
+
+def test_links_being_committed_still_count_as_pending():
+    seen = []
+    writer = None
+
+    def commit(batch):
+        seen.append(writer.pending_links())
+        return len(batch)
+
+    writer = GroupCommitWriter(commit, max_records=1)
+    writer.add({'link': 'a'})
+    assert seen == [{'a'}]
+    assert writer.pending_links() == set()
+
+
+def test_without_delay_commits_run_on_the_calling_thread():
+    threads = []
+    writer = GroupCommitWriter(lambda batch: threads.append(threading.get_ident()) or len(batch), max_records=2, max_delay_ms=None)
+    writer.add({'link': 'a'})
+    time.sleep(0.05)
+    assert threads == []
+    writer.add({'link': 'b'})
+    writer.add({'link': 'c'})
+    writer.flush()
+    assert threads == [threading.get_ident()] * 2
@@ -0,0 +1,54 @@
+import pytest
+
+from prompt_builder import (
+    TokenBudget,
+    TokenBudgetExceeded,
+    build_enrichment_messages,
+    compact_description,
+    estimate_call_tokens,
+)
+
+
+def test_compact_description_matches_whole_words():
+    description = (
+        'We have a bright and lovely home. '
+        'Close to the library. '
+        'Rent is $1,900/mo. '
+        'Spacious 2br near Main. '
+        'Call or text 604-555-0100.'
+    )
+    assert compact_description(description).split('\n') == ['Rent is $1,900/mo.', 'Spacious 2br near Main.']
+
+
+def test_compact_description_drops_repeats_and_keeps_stems():
+    description = 'Fully furnished. Fully furnished. Available from July 1. Utilities included.'
+    assert compact_description(description).split('\n') == ['Fully furnished.', 'Available from July 1.', 'Utilities included.']
+
+
+def test_token_budget_counts_reservations_of_running_calls():
+    budget = TokenBudget(max_tokens=1000)
+    first = budget.reserve(400)
+    second = budget.reserve(400)
+    # two calls in flight: a third would pass the limit before either finishes
+    with pytest.raises(TokenBudgetExceeded):
+        budget.reserve(400)
+
+    budget.record(300, 50, first)
+    budget.release(second)
+    assert budget.total_tokens == 350
+    assert budget.reserved_tokens == 0
+    assert budget.calls == 1
+    assert budget.reserve(600) == 600
+
+
+def test_token_budget_without_limit():
+    budget = TokenBudget()
+    budget.record(10 ** 9, 0, budget.reserve(10 ** 9))
+    assert budget.reserve(10 ** 9) == 10 ** 9
+
+
+def test_estimate_call_tokens_covers_prompt_and_reply():
+    details = {'price': 1900, 'rooms': 2, 'description': 'Rent is $1,900/mo.'}
+    messages = build_enrichment_messages(details)
+    prompt_chars = sum(len(part['text']) for message in messages for part in message['content'])
+    assert estimate_call_tokens(messages, details) > prompt_chars // 4
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+from work_queue import WorkQueue, shard_for_url
+
+
+def make_queue(tmp_path, max_attempts=3):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), max_attempts=max_attempts)
+    queue.enqueue(['https://example.org/1.html'], num_shards=1)
+    return queue
+
+
+def item(queue, url='https://example.org/1.html'):
+    with sqlite3.connect(queue.db_path) as conn:
+        return conn.execute(
+            "SELECT status, lease_owner, attempts FROM work_items WHERE url = ?", (url,)
+        ).fetchone()
+
+
+def test_shard_for_url_is_stable():
+    url = 'https://vancouver.craigslist.org/van/apa/d/123.html'
+    assert shard_for_url(url, 8) == shard_for_url(url, 8)
+    assert 0 <= shard_for_url(url, 8) < 8
+
+
+def test_enqueue_ignores_known_urls(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue(['https://example.org/1.html', 'https://example.org/2.html'], num_shards=1) == 1
+    assert queue.pending_count() == 2
+
+
+def test_leased_url_is_not_claimed_twice(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.claim(0, 'a', lease_seconds=60) == ['https://example.org/1.html']
+    assert queue.claim(0, 'b', lease_seconds=60) == []
+
+
+def test_expired_lease_is_claimed_by_another_worker(tmp_path):
+    queue = make_queue(tmp_path)
+    assert queue.claim(0, 'a', lease_seconds=0.01)
+    time.sleep(0.05)
+    assert queue.claim(0, 'b', lease_seconds=60) == ['https://example.org/1.html']
+    assert item(queue) == ('pending', 'b', 2)
+
+    # the first worker lost its lease, so it can no longer complete the URL
+    queue.complete(['https://example.org/1.html'], 'a')
+    assert item(queue)[0] == 'pending'
+    queue.complete(['https://example.org/1.html'], 'b')
+    assert item(queue)[0] == 'done'
+    assert queue.pending_count() == 0
+
+
+def test_released_url_is_retried_until_attempts_run_out(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    assert queue.claim(0, 'a')
+    queue.release(['https://example.org/1.html'], 'a')
+    assert item(queue) == ('pending', 'a', 1)
+
+    assert queue.claim(0, 'a')
+    queue.release(['https://example.org/1.html'], 'a')
+    assert item(queue) == ('failed', 'a', 2)
+    assert queue.claim(0, 'a') == []
+
+
+def test_expired_lease_with_no_attempts_left_fails(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    for _ in range(2):
+        assert queue.claim(0, 'crashing', lease_seconds=0.01)
+        time.sleep(0.05)
+
+    assert queue.claim(0, 'b') == []
+    assert item(queue)[0] == 'failed'
+    assert queue.pending_count() == 0
+
+
+def test_journal_mode(tmp_path):
+    shared = WorkQueue(str(tmp_path / 'shared.db'))
+    local = WorkQueue(str(tmp_path / 'local.db'), wal=True)
+    with sqlite3.connect(shared.db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+    with sqlite3.connect(local.db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
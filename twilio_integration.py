@@ -3,7 +3,7 @@
 from twilio.rest import Client
 
 from dotenv import load_dotenv
-from craigs_list_beatiful_sup import scrape_craigslist
+from craigs_list_beatiful_sup import iter_craigslist_links
 
 import os
 import time
@@ -20,8 +20,8 @@ my_number = os.getenv("MY_PHONE_NUMBER")
 
 client = Client(account_sid, auth_token)
 
-# scrape craigslist
-links = scrape_craigslist()
+# scrape craigslist, links arrive as the results page is parsed
+links = iter_craigslist_links()
 
 # combined_body = "\n".join([f"Link {i+1}: {link}" for i, link in enumerate(links[:2])])
 
@@ -0,0 +1,147 @@
+import hashlib
+import sqlite3
+import time
+from contextlib import closing
+from typing import Iterable, List, Optional
+
+WORK_QUEUE_PATH = 'work_queue.db'
+
+
+def shard_for_url(url: str, num_shards: int) -> int:
+    """
+    Map a listing URL to a shard. Uses a stable hash so every process and
+    every node agrees on the assignment.
+    """
+    digest = hashlib.sha1(url.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % num_shards
+
+
+class WorkQueue:
+    """
+    Lease-based work queue stored in SQLite.
+
+    A worker claims URLs for a limited time (the lease). If it dies before
+    marking them done, the lease expires and another worker picks them up.
+
+    WAL mode keeps readers and the writer out of each other's way but needs
+    shared memory, so every process must be on the same host. It is off by
+    default: the rollback journal only relies on file locks and also works
+    for a queue file shared over a network file system (one with working
+    POSIX locks, e.g. NFSv4).
+    """
+
+    def __init__(self, db_path: str = WORK_QUEUE_PATH, max_attempts: int = 3, wal: bool = False):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.wal = wal
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_items (
+                    url TEXT PRIMARY KEY,
+                    shard INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    lease_owner TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_work_items_shard ON work_items (shard, status, lease_expires)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute(f"PRAGMA journal_mode={'WAL' if self.wal else 'DELETE'}")
+        return conn
+
+    def enqueue(self, urls: Iterable[str], num_shards: int) -> int:
+        """
+        Add URLs to the queue, assigned to shards by hash. URLs that are
+        already queued are ignored. Returns the number of new items.
+        """
+        rows = [(url, shard_for_url(url, num_shards)) for url in urls]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO work_items (url, shard) VALUES (?, ?)", rows)
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+            return added
+        finally:
+            conn.close()
+
+    def claim(self, shard: int, owner: str, limit: int = 10, lease_seconds: float = 300) -> List[str]:
+        """
+        Lease up to `limit` pending (or expired) URLs of a shard to `owner`.
+        Expired leases that have used up their attempts are marked failed
+        instead of being handed out again.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock, so two workers can't claim the same rows
+            conn.execute("BEGIN IMMEDIATE")
+            # a worker that died mid-batch never calls release(), so its
+            # exhausted URLs are retired here
+            conn.execute(
+                """
+                UPDATE work_items SET status = 'failed'
+                WHERE shard = ? AND status = 'pending' AND lease_expires < ? AND attempts >= ?
+                """,
+                (shard, now, self.max_attempts)
+            )
+            rows = conn.execute(
+                """
+                SELECT url FROM work_items
+                WHERE shard = ? AND status = 'pending' AND lease_expires < ? AND attempts < ?
+                LIMIT ?
+                """,
+                (shard, now, self.max_attempts, limit)
+            ).fetchall()
+            urls = [row[0] for row in rows]
+            conn.executemany(
+                "UPDATE work_items SET lease_owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE url = ?",
+                [(owner, now + lease_seconds, url) for url in urls]
+            )
+            conn.execute("COMMIT")
+            return urls
+        finally:
+            conn.close()
+
+    def complete(self, urls: List[str], owner: str):
+        """
+        Mark leased URLs as done
+        """
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "UPDATE work_items SET status = 'done' WHERE url = ? AND lease_owner = ?",
+                [(url, owner) for url in urls]
+            )
+
+    def release(self, urls: List[str], owner: str):
+        """
+        Give leased URLs back to the queue so they are retried, or mark them
+        failed once they have used up their attempts
+        """
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                """
+                UPDATE work_items
+                SET lease_expires = 0,
+                    status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END
+                WHERE url = ? AND lease_owner = ?
+                """,
+                [(self.max_attempts, url, owner) for url in urls]
+            )
+
+    def pending_count(self, shard: Optional[int] = None) -> int:
+        """
+        Number of URLs not yet done or failed
+        """
+        with closing(self._connect()) as conn:
+            if shard is None:
+                row = conn.execute("SELECT COUNT(*) FROM work_items WHERE status = 'pending'").fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT COUNT(*) FROM work_items WHERE status = 'pending' AND shard = ?", (shard,)
+                ).fetchone()
+            return row[0]